@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ApiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "hwk.apps.api"
+
+    def ready(self):
+        # Connect the session cache invalidation signals
+        from hwk.apps.api import session_cache  # noqa: F401
@@ -2,15 +2,22 @@ from importlib import import_module
 from typing import Optional, Any
 
 import requests
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.contrib.auth import get_user_model
-from django.contrib.sessions.models import Session
 from django.http import HttpRequest
 from ninja.security import APIKeyHeader
 from ninja.security.base import AuthBase
 
+from hwk.apps.api.session_cache import user_for_session
+from hwk.apps.api.tokens import token_from_request, user_for_token
+
 
 class HeaderUserAuth(APIKeyHeader):
+    """
+    Authenticates with the X-SessionID header, or an auth token in the
+    Authorization header.
+    """
+
     param_name = "X-SessionID"
 
     def __init__(self, require_user: bool = True, require_approved: bool = False):
@@ -26,16 +33,23 @@ class HeaderUserAuth(APIKeyHeader):
             request.session = self.SessionStore(header_session_id)
             return True
 
-        User = get_user_model()
-        if header_session_id:
-            try:
+        token = token_from_request(request)
+        if token or header_session_id:
+            # Auth can run several times for one request, through lists of auth
+            # callbacks, so the user is only resolved once
+            credential = token or header_session_id
+            resolved = getattr(request, "_header_user", None)
+            if resolved is not None and resolved[0] == credential:
+                user = resolved[1]
+            elif token:
+                user = user_for_token(token)
+            else:
                 request.session = self.SessionStore(header_session_id)
-                user_id = request.session.get('_auth_user_id')
-                user = User.objects.get(id=user_id)
-                request.user = user
-
-            except (Session.DoesNotExist, User.DoesNotExist):
+                user = user_for_session(request.session)
+            request._header_user = (credential, user)
+            if user is None:
                 return None
+            request.user = user
         else:
             user = request.user
 
@@ -52,6 +66,16 @@ class HeaderUserAuth(APIKeyHeader):
         return None
 
 
+class AsyncHeaderUserAuth(HeaderUserAuth):
+    """
+    HeaderUserAuth for async operations, which looks the session and user up in
+    a thread rather than blocking the event loop.
+    """
+
+    async def __call__(self, request: HttpRequest) -> Optional[Any]:
+        return await sync_to_async(super().__call__)(request)
+
+
 class TurnstileProtected(AuthBase):
     openapi_type: str = "apiKey"
     param_name: str = "X-TURNSTILE"
@@ -0,0 +1,180 @@
+"""
+Resolving an X-SessionID to its user reads the session and then the user, on
+every request. Both lookups are cached in two tiers:
+
+- in process, in a small LRU whose entries only live for LOCAL_TIMEOUT seconds,
+  so repeat requests cost no I/O at all;
+- in the Django cache, when it is shared through HWK_CACHE_REDIS_URL, so every
+  process shares what the others have loaded. A cache private to each process
+  would keep serving sessions that were logged out of elsewhere, so it is
+  skipped.
+
+A session's entry is dropped when the session is deleted or logged out of, which
+also covers its key being cycled on login. A user's entry is dropped whenever the
+user is saved, which covers password changes and approval. Other processes can
+go on using their in-process copy for at most LOCAL_TIMEOUT seconds.
+"""
+import copy
+import time
+from collections import Counter, OrderedDict
+from threading import Lock
+from typing import Any, Callable, Optional, Tuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.signals import user_logged_out
+from django.contrib.sessions.backends.base import SessionBase
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+
+SESSION_KEY = "hwk.session_cache.session.{session_key}"
+USER_KEY = "hwk.session_cache.user.{user_id}"
+CACHE_TIMEOUT = 5 * 60
+LOCAL_TIMEOUT = 5
+LOCAL_SIZE = 1024
+
+_MISSING = object()
+
+_local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+_local_lock = Lock()
+
+hits: Counter = Counter()
+misses: Counter = Counter()
+
+
+def _local_get(key: str) -> Any:
+    with _local_lock:
+        entry = _local.get(key)
+        if entry is None:
+            return _MISSING
+        if entry[0] <= time.monotonic():
+            del _local[key]
+            return _MISSING
+        _local.move_to_end(key)
+        return entry[1]
+
+
+def _local_set(key: str, value: Any):
+    with _local_lock:
+        _local[key] = (time.monotonic() + LOCAL_TIMEOUT, value)
+        _local.move_to_end(key)
+        while len(_local) > LOCAL_SIZE:
+            _local.popitem(last=False)
+
+
+def _forget(key: str):
+    with _local_lock:
+        _local.pop(key, None)
+    cache.delete(key)
+
+
+def _read_through(
+    kind: str, key: str, load: Callable[[], Tuple[Any, int]]
+) -> Optional[Any]:
+    """
+    :param load: Returns the value and how many seconds it may be cached for.
+        Nothing is cached when the value is None.
+    """
+    value = _local_get(key)
+    if value is not _MISSING:
+        hits[kind] += 1
+        return value
+
+    shared = settings.CACHE_IS_SHARED
+    value = cache.get(key, _MISSING) if shared else _MISSING
+    if value is _MISSING:
+        misses[kind] += 1
+        value, timeout = load()
+        if value is None:
+            return None
+        if shared:
+            cache.set(key, value, timeout)
+    else:
+        hits[kind] += 1
+
+    _local_set(key, value)
+    return value
+
+
+def _load_session(session: SessionBase) -> Tuple[Optional[int], int]:
+    user_id = session.get("_auth_user_id")
+    if user_id is None:
+        return None, 0
+    # Never cached for longer than the session has left
+    return int(user_id), min(CACHE_TIMEOUT, session.get_expiry_age())
+
+
+def _load_user(user_id: int) -> Tuple[Any, int]:
+    User = get_user_model()
+    try:
+        return User.objects.get(id=user_id), CACHE_TIMEOUT
+    except User.DoesNotExist:
+        return None, 0
+
+
+def user_for_session(session: SessionBase) -> Optional[Any]:
+    """
+    The user logged in to the session, or None.
+
+    Each call returns its own copy of the user, so changes made while handling
+    one request are never seen by another.
+    """
+    if not session.session_key:
+        return None
+    user_id = _read_through(
+        "session",
+        SESSION_KEY.format(session_key=session.session_key),
+        lambda: _load_session(session),
+    )
+    if user_id is None:
+        return None
+    return get_user(user_id)
+
+
+def get_user(user_id: int) -> Optional[Any]:
+    """
+    The user, or None if they do not exist, as a copy of their own.
+    """
+    user = _read_through(
+        "user", USER_KEY.format(user_id=user_id), lambda: _load_user(user_id)
+    )
+    return copy.deepcopy(user)
+
+
+def forget_session(session_key: Optional[str]):
+    if session_key:
+        _forget(SESSION_KEY.format(session_key=session_key))
+
+
+def forget_user(user_id: int):
+    _forget(USER_KEY.format(user_id=user_id))
+
+
+def clear():
+    """
+    Empties the in-process tier.
+    """
+    with _local_lock:
+        _local.clear()
+
+
+@receiver(user_logged_out)
+def logged_out(sender, request, **kwargs):
+    forget_session(request.session.session_key)
+
+
+@receiver(post_delete, sender=Session)
+def session_deleted(sender, instance, **kwargs):
+    forget_session(instance.session_key)
+
+
+@receiver([post_save, post_delete], sender=get_user_model())
+def user_changed(sender, instance, **kwargs):
+    forget_user(instance.id)
+    # Forget again once committed, in case another request reloaded the old row
+    # in the meantime
+    transaction.on_commit(lambda: forget_user(instance.id))
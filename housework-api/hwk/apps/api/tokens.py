@@ -0,0 +1,74 @@
+"""
+Auth tokens are an alternative to X-SessionID that needs no session row. A token
+is the user's id and auth version, signed with SECRET_KEY and timestamped, and is
+sent as:
+Authorization: Bearer <token>
+
+Checking one needs only the user, who is usually cached. Raising the user's auth
+version revokes every token issued to them, which happens when they log out or
+change their password.
+"""
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import F
+from django.http import HttpRequest
+
+from hwk.apps.api.session_cache import get_user
+
+
+TOKEN_SALT = "hwk.api.tokens"
+
+
+def issue_token(user) -> str:
+    return signing.dumps({"u": user.id, "v": user.auth_version}, salt=TOKEN_SALT)
+
+
+def token_from_request(request: HttpRequest) -> Optional[str]:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    return token.strip()
+
+
+def user_for_token(token: str) -> Optional[Any]:
+    """
+    The user the token was issued to, or None if it is invalid, expired or
+    revoked.
+    """
+    try:
+        payload = signing.loads(
+            token, salt=TOKEN_SALT, max_age=settings.AUTH_TOKEN_MAX_AGE
+        )
+        user_id, version = int(payload["u"]), int(payload["v"])
+    except (signing.BadSignature, KeyError, TypeError, ValueError):
+        return None
+
+    user = get_user(user_id)
+    if user is None or user.auth_version != version:
+        return None
+    return user
+
+
+def revoke_tokens(user):
+    """
+    Revokes every token issued to the user.
+    """
+    user.auth_version = F("auth_version") + 1
+    # Saving drops the cached user, so the new version is seen straight away
+    user.save(update_fields=["auth_version"])
+    user.refresh_from_db(fields=["auth_version"])
+
+
+def rotate_tokens(request: HttpRequest, user) -> Dict[str, str]:
+    """
+    Revokes every token issued to the user, then issues a new one if the request
+    was made with a token, so the client making it stays logged in.
+
+    :return: The credentials to send back.
+    """
+    revoke_tokens(user)
+    if token_from_request(request):
+        return {"x-authtoken": issue_token(user)}
+    return {}
@@ -1,8 +1,8 @@
 from datetime import timedelta, datetime
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 from django.conf import settings
-from django.contrib.auth import authenticate, login, logout
+from django.contrib.auth import authenticate, login, logout, user_logged_in
 from django.middleware.csrf import get_token
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
@@ -16,6 +16,7 @@ import string
 from pydantic import EmailStr
 
 from hwk.apps.api.auth import TurnstileProtected, HeaderUserAuth
+from hwk.apps.api.tokens import issue_token, revoke_tokens, token_from_request
 from hwk.apps.people.models import HwkUser
 from hwk.apps.teams.models import Membership, Team, MembershipRole
 
@@ -27,7 +28,25 @@ def generate_secure_sequence(length=6):
     alphabet = string.ascii_lowercase
 
     # Generate a secure random string of specified length
-    return ''.join(secrets.choice(alphabet) for _ in range(length))
+    return "".join(secrets.choice(alphabet) for _ in range(length))
+
+
+def log_in(request, user) -> Dict[str, str]:
+    """
+    Logs the user in with a session, an auth token or both, as AUTH_MODE says.
+
+    :return: The credentials to send back.
+    """
+    credentials = {}
+    if settings.AUTH_MODE == "token":
+        # No session is kept, but last_login is still updated
+        user_logged_in.send(sender=user.__class__, request=request, user=user)
+    else:
+        login(request, user)
+        credentials["x-sessionid"] = request.session.session_key
+    if settings.AUTH_MODE != "session":
+        credentials["x-authtoken"] = issue_token(user)
+    return credentials
 
 
 class LoginSchema(Schema):
@@ -51,7 +70,9 @@ def send_otp(request, data: OTPSendRequest = Body(...)):
     request.session["otp.challenge.open"] = True
     request.session["otp.challenge.code"] = otp
     request.session["otp.challenge.issued"] = timezone.now().isoformat()
-    request.session["otp.challenge.expires"] = (timezone.now() + timedelta(minutes=5)).isoformat()
+    request.session["otp.challenge.expires"] = (
+        timezone.now() + timedelta(minutes=5)
+    ).isoformat()
     revealed: Optional[str] = None
 
     if config.SEND_EMAILS:
@@ -69,15 +90,14 @@ def send_otp(request, data: OTPSendRequest = Body(...)):
 
     request.session.save()
 
-    return {
-        "x-sessionid": request.session.session_key,
-        "revealed": revealed
-    }
+    return {"x-sessionid": request.session.session_key, "revealed": revealed}
 
 
 @auth_router.post("/otp/respond", auth=[HeaderUserAuth(require_user=False)])
 def respond_otp(request, data: OTPRespondRequest = Body(...)):
-    request.session["otp.challenge.attempts"] = request.session.get("otp.challenge.attempts", 0) + 1
+    request.session["otp.challenge.attempts"] = (
+        request.session.get("otp.challenge.attempts", 0) + 1
+    )
 
     otp_challenge_sub = request.session.get("otp.challenge.sub", None)
     otp_challenge_open = request.session.get("otp.challenge.open", False)
@@ -118,17 +138,22 @@ def respond_otp(request, data: OTPRespondRequest = Body(...)):
         user = HwkUser.objects.get(email=otp_challenge_sub)
     except HwkUser.DoesNotExist:
         request.session["otp.challenge.created"] = True
-        user = HwkUser.objects.create_user(username=otp_challenge_sub, email=otp_challenge_sub)
+        user = HwkUser.objects.create_user(
+            username=otp_challenge_sub, email=otp_challenge_sub
+        )
 
     request.session["otp.challenge.passed"] = timezone.now().isoformat()
 
-    login(request, user)
+    credentials = log_in(request, user)
 
-    request.session.save()
+    if "x-sessionid" in credentials:
+        request.session.save()
+    else:
+        # The challenge is over, and nothing else needs the session
+        request.session.flush()
+
+    return credentials
 
-    return {
-        "x-sessionid": request.session.session_key,
-    }
 
 @auth_router.post("/session", auth=[TurnstileProtected()])
 @csrf_exempt
@@ -136,11 +161,7 @@ def login_user(request, data: LoginSchema):
     user = authenticate(request, username=data.username, password=data.password)
 
     if user is not None:
-        login(request, user)
-        return {
-            "x-csrftoken": get_token(request),
-            "x-sessionid": request.session.session_key,
-        }
+        return {"x-csrftoken": get_token(request), **log_in(request, user)}
     else:
         return {"success": False, "message": "Invalid username or password."}
 
@@ -148,6 +169,8 @@ def login_user(request, data: LoginSchema):
 @auth_router.delete("/session")
 @csrf_exempt
 def logout_user(request):
+    if token_from_request(request):
+        revoke_tokens(request.user)
     logout(request)
     return {"success": True, "message": "User successfully logged out."}
 
@@ -2,6 +2,7 @@ from datetime import date
 from typing import List, Union, Literal, Optional
 from uuid import UUID
 
+from django.db import transaction
 from django.db.models import Q
 from ninja import Router, Query, Body, Schema
 from ninja.errors import HttpError
@@ -36,7 +37,7 @@ def get_jobs(
     team_id: List[UUID] = Query([]),
     status: List[JobLifecycle] = Query([]),
 ):
-    jobs = Job.objects.all()
+    jobs = Job.objects.defer("explanation", "explanation_data")
     if only_self:
         jobs = jobs.filter(assignee__user=request.user)
     if len(team_id):
@@ -80,22 +81,23 @@ def create_job_from_config(
         except JobVariant.DoesNotExist:
             raise HttpError(400, "Variant does not exist")
 
-    new_job = Job(
-        job_config=config,
-        default_credit=config.default_credit,
-        team=config.team,
-        name=config.name,
-        **{**data.dict(), "assignee": membership}
-    )
-    new_job.save()
-    process_triggers(new_job)
-    process_job(new_job)
-
-    if complete:
-        if not set_job_status(
-            new_job, JobLifecycle.COMPLETE, membership, job_variant=variant_model
-        ):
-            raise HttpError(403, "Transition is not allowed")
+    with transaction.atomic():
+        new_job = Job(
+            job_config=config,
+            default_credit=config.default_credit,
+            team=config.team,
+            name=config.name,
+            **{**data.dict(), "assignee": membership}
+        )
+        new_job.save()
+        process_triggers(new_job)
+        process_job(new_job)
+
+        if complete:
+            if not set_job_status(
+                new_job, JobLifecycle.COMPLETE, membership, job_variant=variant_model
+            ):
+                raise HttpError(403, "Transition is not allowed")
 
     return new_job
 
@@ -105,16 +107,17 @@ def create_job(request, data: JobCreateSchema):
     team = Team.objects.get(id=data.team, memberships__user=request.user)
     assignee = team.memberships.get(id=data.assignee)
 
-    new_job = Job(
-        **{
-            **data.dict(),
-            "team": team,
-            "assignee": assignee,
-        }
-    )
-    new_job.save()
-    process_triggers(new_job)
-    process_job(new_job)
+    with transaction.atomic():
+        new_job = Job(
+            **{
+                **data.dict(),
+                "team": team,
+                "assignee": assignee,
+            }
+        )
+        new_job.save()
+        process_triggers(new_job)
+        process_job(new_job)
 
     return new_job
 
@@ -160,7 +163,7 @@ def close_job(
 
 class JobDryRunSchema(Schema):
     created_job: JobConfigSchema
-    proposed_date: date
+    proposed_date: Optional[date]
     trigger: JobTriggerSchema
 
 
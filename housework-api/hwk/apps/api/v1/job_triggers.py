@@ -14,7 +14,7 @@ from hwk.apps.api.v1.schema import (
     JobScheduleRuleUpdateSchema,
 )
 from hwk.apps.jobs.models import JobTrigger, JobConfig, JobScheduleRule
-from hwk.apps.jobs.rules import get_function, validate_rule
+from hwk.apps.jobs.rules import get_function, validate_rule_set
 from hwk.apps.teams.models import Membership
 
 job_triggers_router = Router(tags=["Job Triggers"])
@@ -118,12 +118,12 @@ def add_rule_to_trigger(
     except JobTrigger.DoesNotExist:
         raise HttpError(400, "Trigger does not exist on team")
 
-    rule = JobScheduleRule.objects.create(
+    rule = JobScheduleRule(
         trigger=trigger,
         rule_type=data.rule_type,
         params=data.params,
     )
-    valid, error = validate_rule(rule)
+    valid, error = validate_rule_set([*trigger.rules.all(), rule])
 
     if not valid:
         raise HttpError(400, error)
@@ -154,7 +154,12 @@ def update_rule(
         raise HttpError(400, "Trigger does not exist on team")
 
     rule.params = data.params
-    valid, error = validate_rule(rule)
+    valid, error = validate_rule_set(
+        [
+            *JobScheduleRule.objects.filter(trigger_id=trigger_id).exclude(id=rule.id),
+            rule,
+        ]
+    )
 
     if not valid:
         raise HttpError(400, error)
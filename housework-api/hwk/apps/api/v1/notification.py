@@ -1,18 +1,123 @@
-from typing import Dict, Any, List
+from base64 import urlsafe_b64encode, urlsafe_b64decode
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
 
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Max, Q
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
 from django.utils import timezone
-from ninja import Router, Body
+from ninja import Router, Body, Query
 from ninja.errors import HttpError
 
-from hwk.apps.api.v1.schema import NotificationSchema
+from hwk.apps.api.auth import AsyncHeaderUserAuth
+from hwk.apps.api.v1.schema import NotificationSchema, UnreadCountSchema
 from hwk.apps.notifications.models import SubscriptionChannelType, SubscriptionChannel, Notification
+from hwk.apps.notifications.stream import events, team_channel, user_channel
+from hwk.apps.teams.models import Membership
 
 notification_router = Router(tags=["Notifications"])
 
 
+UNREAD_PAGE_SIZE = 50
+
+
+def encode_cursor(notification: Notification) -> str:
+    value = f"{notification.date_created.isoformat()}|{notification.id}"
+    return urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        date_created, notification_id = (
+            urlsafe_b64decode(cursor.encode()).decode().split("|")
+        )
+        return datetime.fromisoformat(date_created), int(notification_id)
+    except ValueError:
+        raise HttpError(400, "Invalid cursor")
+
+
+def unread_summary(user) -> Tuple[int, str]:
+    """
+    Counts a user's unread notifications with one lookup on the (recipient,
+    date_read) index.
+
+    :return: The count, and an ETag that changes whenever the unread list does.
+    """
+    summary = Notification.objects.filter(recipient=user, date_read=None).aggregate(
+        count=Count("id"), newest=Max("id")
+    )
+    return summary["count"], f'W/"{summary["newest"] or 0}-{summary["count"]}"'
+
+
+def is_not_modified(request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match", "")
+    return etag in [_.strip() for _ in if_none_match.split(",")]
+
+
 @notification_router.get("unread", response=List[NotificationSchema])
-def get_unread(request):
-    return Notification.objects.filter(recipient=request.user, date_read=None)
+def get_unread(
+    request,
+    response: HttpResponse,
+    cursor: Optional[str] = None,
+    limit: int = Query(UNREAD_PAGE_SIZE, ge=1, le=200),
+):
+    """
+    Unread notifications, newest first, a page at a time.
+
+    When there are more, the X-Next-Cursor header holds the cursor for the next
+    page. The first page honours If-None-Match.
+    """
+    notifications = Notification.objects.filter(recipient=request.user, date_read=None)
+
+    if cursor is None:
+        _, etag = unread_summary(request.user)
+        if is_not_modified(request, etag):
+            return HttpResponseNotModified(headers={"ETag": etag})
+        response["ETag"] = etag
+    else:
+        date_created, notification_id = decode_cursor(cursor)
+        notifications = notifications.filter(
+            Q(date_created__lt=date_created)
+            | Q(date_created=date_created, id__lt=notification_id)
+        )
+
+    page = list(notifications.order_by("-date_created", "-id")[: limit + 1])
+    if len(page) > limit:
+        page = page[:limit]
+        response["X-Next-Cursor"] = encode_cursor(page[-1])
+    return page
+
+
+@notification_router.get("unread/count", response=UnreadCountSchema)
+def get_unread_count(request, response: HttpResponse):
+    count, etag = unread_summary(request.user)
+    if is_not_modified(request, etag):
+        return HttpResponseNotModified(headers={"ETag": etag})
+    response["ETag"] = etag
+    return {"count": count}
+
+
+@notification_router.get("stream", auth=AsyncHeaderUserAuth())
+async def stream(request):
+    """
+    Server-sent events for the user's new notifications ("notification") and
+    changes to their teams' jobs ("job"), as they happen.
+
+    Only served by the ASGI application. Browsers' EventSource cannot send the
+    X-SessionID header, so clients read the stream with fetch.
+    """
+    team_ids = await sync_to_async(list)(
+        Membership.objects.filter(user=request.auth).values_list("team_id", flat=True)
+    )
+    channels = [user_channel(request.auth.id)] + [team_channel(_) for _ in team_ids]
+
+    response = StreamingHttpResponse(
+        events(channels), content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    # Stops nginx buffering the stream
+    response["X-Accel-Buffering"] = "no"
+    return response
 
 
 @notification_router.post("subscribe", response=int)
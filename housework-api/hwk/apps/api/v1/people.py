@@ -8,9 +8,10 @@ from django.contrib.sessions.models import Session
 from django.utils import timezone
 from ninja import Router, Schema, Body, ModelSchema
 from ninja.pagination import paginate
-from pydantic import EmailStr
+from pydantic import EmailStr, Field
 
 from hwk.apps.api.auth import TurnstileProtected, HeaderUserAuth
+from hwk.apps.api.tokens import rotate_tokens
 from hwk.apps.api.v1.schema import UserSchema, UserSelfSchema
 from hwk.apps.people.models import HwkUser
 from hwk.apps.teams.models import Membership
@@ -32,6 +33,11 @@ class UserResponseSchema(ModelSchema):
         model_fields = ["full_name", "short_name", "email"]
 
 
+class UserUpdateResponseSchema(UserResponseSchema):
+    # Only set when the password changed on a request made with a token
+    authtoken: Optional[str] = Field(None, alias="x-authtoken")
+
+
 class UserListSchema(Schema):
     username: str
     full_name: Optional[str]
@@ -55,6 +61,10 @@ class ActionResponse(Schema):
     message: str
 
 
+class PasswordChangeResponse(ActionResponse):
+    authtoken: Optional[str] = Field(None, alias="x-authtoken")
+
+
 @people_router.get("/users/", response=List[UserListSchema])
 @paginate
 def get_users(request):
@@ -75,18 +85,24 @@ def get_users(request):
 
 @people_router.patch(
     "/users/self/",
-    response=UserResponseSchema,
+    response=UserUpdateResponseSchema,
     auth=[HeaderUserAuth(require_approved=False)],
+    by_alias=True,
 )
 def update_user(request, data: UserEditSchema):
-    for key, value in data.dict(exclude_unset=True).items():
+    changes = data.dict(exclude_unset=True)
+    for key, value in changes.items():
         if key in ["full_name", "short_name"]:
             setattr(request.user, key, value)
         if key == "password":
             request.user.set_password(value)
 
-    request.user.save()
-    return request.user
+    # The user may be a cached copy, so only what changed is written
+    request.user.save(update_fields=list(changes))
+    credentials = {}
+    if "password" in changes:
+        credentials = rotate_tokens(request, request.user)
+    return {**UserResponseSchema.from_orm(request.user).dict(), **credentials}
 
 
 @people_router.get(
@@ -104,7 +120,7 @@ def get_current_user(request):
 @people_router.put("/users/self/preferences", response=Optional[UserSelfSchema])
 def set_current_user_preferences(request, preferences: Dict[str, Any] = Body({})):
     request.user.preferences = preferences
-    request.user.save()
+    request.user.save(update_fields=["preferences"])
 
     return request.user
 
@@ -137,7 +153,8 @@ class PasswordChangeModel(Schema):
 
 @people_router.post(
     "/users/self/password",
-    response={403: ActionResponse, 401: ActionResponse, 200: ActionResponse},
+    response={403: ActionResponse, 401: ActionResponse, 200: PasswordChangeResponse},
+    by_alias=True,
 )
 def change_password(request, password_data: PasswordChangeModel):
     user = request.user
@@ -150,5 +167,9 @@ def change_password(request, password_data: PasswordChangeModel):
 
     # Set new password
     user.set_password(password_data.new_password)
-    user.save()
-    return {"success": True, "message": "Password updated successfully"}
+    user.save(update_fields=["password"])
+    return {
+        "success": True,
+        "message": "Password updated successfully",
+        **rotate_tokens(request, user),
+    }
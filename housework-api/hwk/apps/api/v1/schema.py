@@ -12,6 +12,7 @@ from hwk.apps.jobs.models import (
     JobLifecycle,
     Job, Credit,
 )
+from hwk.apps.jobs.explanation import render_explanation
 from hwk.apps.jobs.rules import validate_rule
 from hwk.apps.notifications.models import Notification
 from hwk.apps.people.models import HwkUser
@@ -136,7 +137,7 @@ class JobConfigSchema(ModelSchema):
 class JobTriggerCreateSchema(ModelSchema):
     class Config:
         model = JobTrigger
-        model_exclude = ["id"]
+        model_exclude = ["id", "rules_version"]
 
 
 class JobTriggerUpdateSchema(Schema):
@@ -155,7 +156,7 @@ class JobSchema(ModelSchema):
 
     class Config:
         model = Job
-        model_fields = "__all__"
+        model_exclude = ["explanation", "explanation_data"]
 
 
 class JobCreateFromConfigSchema(ModelSchema):
@@ -204,6 +205,13 @@ class JobDetailSchema(JobSchema):
     job_config: Optional[JobConfigSchema]
     assignee: MembershipSchema
     completed_by: Optional[MembershipSchema]
+    explanation: Optional[str]
+
+    @staticmethod
+    def resolve_explanation(obj):
+        if obj.explanation_data:
+            return render_explanation(obj.explanation_data)
+        return obj.explanation
 
 
 class NotificationSchema(ModelSchema):
@@ -212,6 +220,10 @@ class NotificationSchema(ModelSchema):
         model_fields = "__all__"
 
 
+class UnreadCountSchema(Schema):
+    count: int
+
+
 class InvitationSchema(ModelSchema):
     issuer: UserSchema
     team: TeamResponse
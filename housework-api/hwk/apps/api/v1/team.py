@@ -214,7 +214,7 @@ def respond_invitation(request, invitation_id: int, action: InvitationAction):
         with transaction.atomic():
             if invitation.issuer.approved:
                 request.user.approved = True
-                request.user.save()
+                request.user.save(update_fields=["approved"])
             existing = Membership.objects.filter(user=request.user, team=invitation.team)
             existing_count = existing.count()
             if existing_count > 1:
@@ -7,6 +7,8 @@ from hwk.apps.jobs.models import (
     JobTrigger,
     JobScheduleRule,
     Credit,
+    CreditBalance,
+    TeamCreditBalance,
 )
 
 
@@ -53,3 +55,13 @@ class JobScheduleRuleAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Credit)
+
+
+@admin.register(CreditBalance)
+class CreditBalanceAdmin(admin.ModelAdmin):
+    list_display = ["person", "job_config", "amount"]
+
+
+@admin.register(TeamCreditBalance)
+class TeamCreditBalanceAdmin(admin.ModelAdmin):
+    list_display = ["person", "amount"]
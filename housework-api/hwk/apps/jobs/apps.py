@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class JobsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "hwk.apps.jobs"
+
+    def ready(self):
+        # Connect the rule chain and config cache invalidation signals, and the
+        # credit balance updates
+        from hwk.apps.jobs import rules  # noqa: F401
+        from hwk.apps.jobs import ledger  # noqa: F401
+        from hwk.apps.jobs import config_cache  # noqa: F401
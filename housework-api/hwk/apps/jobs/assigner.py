@@ -1,87 +1,119 @@
 from datetime import datetime, time
 from random import random
+from typing import Optional
 
-from django.db.models import Sum
+import numpy as np
+from django.db.models import QuerySet, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
+from hwk.apps.jobs.explanation import build_explanation
 from hwk.apps.jobs.models import (
     JobTrigger,
     Job,
-    Credit,
     JobTriggerExistingPolicy,
     JobLifecycle,
+    JobConfig,
+    CreditBalance,
 )
-from hwk.apps.jobs.rules import schedule_for_user
-from hwk.apps.teams.models import HolidayPolicy
-
+from hwk.apps.jobs.availability import AvailabilityCache
+from hwk.apps.jobs.rules import (
+    build_rules,
+    first_candidate_date,
+    rules_date_mask,
+    search_until,
+)
+from hwk.apps.jobs.scoring import score_candidates, ScoringPolicy, restricts_to_earliest
+from hwk.apps.teams.models import Team, Membership
+
+
+def load_balances(team: Team, job_config: Optional[JobConfig]) -> QuerySet[Membership]:
+    """
+    Fetches every member of a team annotated with their credit balances.
+
+    Balances are read from the maintained ``TeamCreditBalance`` and ``CreditBalance``
+    rows in a single query, rather than summing the credit ledger for each member.
+
+    :param team: The team to load members for.
+    :param job_config: The job config to compute the ``job_balance`` for.
+    :return: Memberships annotated with ``team_balance`` and ``job_balance``.
+    """
+    job_balance = CreditBalance.objects.filter(
+        person=OuterRef("pk"), job_config=job_config
+    ).values("amount")[:1]
+    return team.memberships.select_related("user").annotate(
+        team_balance=Coalesce("team_credit_balance__amount", 0),
+        job_balance=Coalesce(Subquery(job_balance), 0),
+    )
 
-def normalise(data, key, max_value):
-    min_value = min(_[key] for _ in data)
-    for item in data:
-        item["normed_" + key] = min(1, (item[key] - min_value) / max_value)
 
+def create_job_from_trigger(
+    job: Job, trigger: JobTrigger, availability: Optional[AvailabilityCache] = None
+) -> Optional[Job]:
+    """
+    Creates the job for a trigger, assigned to the best scoring member.
 
-def create_job_from_trigger(job: Job, trigger: JobTrigger):
-    explainer = ""
-    explainer += f"# Scheduling {trigger.create_config.name}\n"
+    :param availability: Team availability to reuse between triggers fired together.
+    :return: The new (or existing) job, or None if no member has a date that
+        satisfies the trigger's rules within the search horizon.
+    """
     team = trigger.from_config.team
-    available = team.memberships.all()
+    available = list(load_balances(team, job.job_config))
+
+    # Evaluate the rules once for the whole team, then find each member's first
+    # free day that satisfies them
+    start = first_candidate_date(delay=job.delay)
+    until = search_until(start)
+    team_availability = (availability or AvailabilityCache()).for_team(
+        team, available, (until - first_candidate_date()).days + 1
+    )
+    dates = team_availability.dates
+    date_mask = rules_date_mask(build_rules(trigger), job, dates)
+    date_mask &= (dates >= np.datetime64(start, "D")) & (
+        dates <= np.datetime64(until, "D")
+    )
+    available_dates = team_availability.earliest_dates(date_mask)
 
     workers = []
 
     for worker in available:
-        available_date = schedule_for_user(membership=worker, trigger=trigger, job=job)
-        worker_credit = Credit.objects.filter(person=worker)
-        team_balance = worker_credit.aggregate(total=Sum("amount"))["total"]
-        job_balance = worker_credit.filter(job__job_config=job.job_config).aggregate(
-            total=Sum("amount")
-        )["total"]
-        random_value = random()
-        explainer += f"\n## {worker.user.full_name}\n\n"
-        explainer += f"- Available from: {available_date}\n"
-        explainer += f"- Has {job_balance or 0} credit on job {job.name}\n"
-        explainer += f"- Has {team_balance or 0} credit in team {team.name}\n"
-        explainer += f"- Gets {random_value:.2f} random value\n"
         workers.append(
             dict(
                 worker=worker,
-                available_date=available_date,
-                team_balance=team_balance or 0,
-                job_balance=job_balance or 0,
-                random_value=random_value,
+                available_date=available_dates.get(worker.user_id),
+                team_balance=worker.team_balance or 0,
+                job_balance=worker.job_balance or 0,
+                random_value=random(),
             )
         )
 
-    normalise(workers, "team_balance", team.policy_max_team_diff)
-    normalise(workers, "job_balance", team.policy_max_job_diff)
-
-    earliest_date = min(_["available_date"] for _ in workers)
-
-    if trigger.urgent or team.policy_when_on_holiday == HolidayPolicy.FIND_OTHER:
-        available_workers = [_ for _ in workers if _["available_date"] == earliest_date]
-        if len(available_workers) < len(workers):
-            workers = available_workers
-            explainer += "\n## Availability\n\nSome candidates were removed due to lack of availability.\n"
-
-    explainer += "\n## Scoring\n\n| Candidate | Random | Team | Job | Score |\n| - | - | - | - | - |\n"
-    for worker in workers:
-        weighted = worker["random_value"] * team.policy_random_weight
-        weighted += worker["normed_team_balance"] * team.policy_team_credit_weight
-        weighted += worker["normed_job_balance"] * team.policy_job_credit_weight
-        explainer += f"| {worker['worker'].user} |"
-        explainer += f"{worker['random_value']:.2f} * {team.policy_random_weight} |"
-        explainer += (
-            f"{worker['normed_team_balance']:.2f} * {team.policy_team_credit_weight} |"
-        )
-        explainer += (
-            f"{worker['normed_job_balance']:.2f} * {team.policy_job_credit_weight} |"
-        )
-        explainer += f"{weighted:.2f} |\n"
-        worker["score"] = weighted
+    unavailable = [_ for _ in workers if _["available_date"] is None]
+    workers = [_ for _ in workers if _["available_date"] is not None]
+
+    if not workers:
+        return None
 
-    selected = sorted(workers, key=lambda _: _["score"])[0]
+    policy = ScoringPolicy.from_team(team)
+    scores = score_candidates(
+        policy,
+        day_offset=np.array([_["available_date"].toordinal() for _ in workers]),
+        team_balance=np.array([_["team_balance"] for _ in workers]),
+        job_balance=np.array([_["job_balance"] for _ in workers]),
+        random_value=np.array([_["random_value"] for _ in workers]),
+        restrict_to_earliest=restricts_to_earliest(team, trigger.urgent),
+    )
 
-    explainer += f"\n## Result\n\n{selected['worker'].user} is selected.\n"
+    selected = workers[scores.selected]
+
+    explanation = build_explanation(
+        config_name=trigger.create_config.name,
+        job_name=job.name,
+        team_name=team.name,
+        policy=policy,
+        workers=workers,
+        scores=scores,
+        unavailable=unavailable,
+    )
 
     # Now time to check for existing jobs:
     existing = (
@@ -99,7 +131,7 @@ def create_job_from_trigger(job: Job, trigger: JobTrigger):
     result = Job(
         name=trigger.create_config.name,
         team=trigger.create_config.team,
-        explanation=explainer,
+        explanation_data=explanation,
         job_config=trigger.create_config,
         is_priority=trigger.urgent,
         due_date=timezone.make_aware(
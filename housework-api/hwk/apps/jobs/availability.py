@@ -0,0 +1,71 @@
+from datetime import date, timedelta
+from typing import Dict, Iterable, Optional
+
+import numpy as np
+
+from hwk.apps.jobs.rules import first_candidate_date
+from hwk.apps.people.holidays import get_holiday_index
+from hwk.apps.teams.models import Team, Membership
+
+
+class TeamAvailability:
+    """
+    Which days each member of a team is free, as a members x days boolean matrix.
+
+    Only holidays differ between members, so a trigger's rules can be evaluated
+    once as a date mask and combined with every member's row at the same time.
+    """
+
+    def __init__(self, user_ids: Iterable[int], start: date, days: int):
+        self.start = start
+        self.dates = np.arange(days) + np.datetime64(start, "D")
+        self.rows = {user_id: row for row, user_id in enumerate(user_ids)}
+        self.free = np.ones((len(self.rows), days), dtype=bool)
+
+        for user_id, row in self.rows.items():
+            holidays = get_holiday_index(user_id)
+            for holiday_start, holiday_end in zip(holidays.starts, holidays.ends):
+                first = max((holiday_start - start).days, 0)
+                last = max((holiday_end - start).days + 1, 0)
+                self.free[row, first:last] = False
+
+    @property
+    def days(self) -> int:
+        return len(self.dates)
+
+    def earliest_dates(self, date_mask: np.ndarray) -> Dict[int, Optional[date]]:
+        """
+        Finds each member's first free day that is also allowed by ``date_mask``.
+
+        :param date_mask: A boolean array with one value per day in the matrix.
+        :return: The date for each user id, or None if there is no such day.
+        """
+        combined = self.free & date_mask
+        found = combined.any(axis=1)
+        first = combined.argmax(axis=1)
+        return {
+            user_id: (
+                self.start + timedelta(days=int(first[row])) if found[row] else None
+            )
+            for user_id, row in self.rows.items()
+        }
+
+
+class AvailabilityCache:
+    """
+    Team availability matrices, shared by every trigger fired by the same event.
+    """
+
+    def __init__(self):
+        self._teams: Dict[object, TeamAvailability] = {}
+
+    def for_team(
+        self, team: Team, memberships: Iterable[Membership], days: int
+    ) -> TeamAvailability:
+        availability = self._teams.get(team.id)
+        if availability is None or availability.days < days:
+            availability = TeamAvailability(
+                [_.user_id for _ in memberships], first_candidate_date(), days
+            )
+            self._teams[team.id] = availability
+        return availability
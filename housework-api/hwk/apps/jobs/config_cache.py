@@ -0,0 +1,165 @@
+"""
+Teams, job configs, triggers and rules are read on every job transition but
+rarely change. They are cached in two tiers:
+
+- in process, for at most LOCAL_TIMEOUT seconds, so repeat lookups cost no I/O
+  at all;
+- in the Django cache, which is Redis when HWK_CACHE_REDIS_URL is set, so the
+  API and Celery processes share what each other have loaded.
+
+Every key includes a generation stamp that is replaced whenever any of the cached
+models is saved or deleted, which invalidates both tiers. The process making the
+change sees it at once. Other processes hold the stamp in process too, so they
+see it within LOCAL_TIMEOUT seconds. That only works when the Django cache is
+shared, so without it nothing is cached and every lookup goes to the database.
+"""
+import time
+import uuid
+from collections import Counter
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from hwk.apps.jobs.models import Job, JobConfig, JobTrigger, JobScheduleRule
+from hwk.apps.teams.models import Team
+
+
+GENERATION_KEY = "hwk.config_cache.generation"
+CACHE_KEY = "hwk.config_cache.{generation}.{key}"
+CACHE_TIMEOUT = 60 * 60
+# Bounds how long a missed invalidation can last in a process
+LOCAL_TIMEOUT = 60
+
+_MISSING = object()
+
+_local: Dict[str, Tuple[float, Any]] = {}
+_local_generation: Optional[str] = None
+_local_generation_expires = 0.0
+
+hits: Counter = Counter()
+misses: Counter = Counter()
+
+
+def _set_local_generation(generation: str):
+    global _local_generation, _local_generation_expires
+
+    if generation != _local_generation:
+        _local.clear()
+        _local_generation = generation
+    _local_generation_expires = time.monotonic() + LOCAL_TIMEOUT
+
+
+def _generation() -> str:
+    """
+    The current generation, only read from the Django cache once every
+    LOCAL_TIMEOUT seconds.
+    """
+    if _local_generation is not None and _local_generation_expires > time.monotonic():
+        return _local_generation
+
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        cache.add(GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(GENERATION_KEY)
+    _set_local_generation(generation)
+    return generation
+
+
+def _read_through(kind: str, key: str, load: Callable[[], Any]) -> Any:
+    if not settings.CACHE_IS_SHARED:
+        misses[kind] += 1
+        return load()
+
+    generation = _generation()
+    cache_key = CACHE_KEY.format(generation=generation, key=key)
+    expires, value = _local.get(cache_key, (0, _MISSING))
+    if value is not _MISSING and expires > time.monotonic():
+        hits[kind] += 1
+        return value
+
+    value = cache.get(cache_key, _MISSING)
+    if value is _MISSING:
+        misses[kind] += 1
+        value = load()
+        cache.set(cache_key, value, CACHE_TIMEOUT)
+    else:
+        hits[kind] += 1
+
+    _local[cache_key] = (time.monotonic() + LOCAL_TIMEOUT, value)
+    return value
+
+
+def get_team(team_id) -> Team:
+    return _read_through(
+        "team", f"team.{team_id}", lambda: Team.objects.get(id=team_id)
+    )
+
+
+def get_job_config(job_config_id: int) -> JobConfig:
+    return _read_through(
+        "job_config",
+        f"job_config.{job_config_id}",
+        lambda: JobConfig.objects.select_related("team").get(id=job_config_id),
+    )
+
+
+def triggers_for(from_config_id: int, lifecycle: str) -> List[JobTrigger]:
+    """
+    The triggers fired when a job from ``from_config_id`` enters ``lifecycle``,
+    loaded with their configs, team and rules.
+    """
+    lifecycle = lifecycle.lower()
+    return _read_through(
+        "triggers",
+        f"triggers.{from_config_id}.{lifecycle}",
+        lambda: list(
+            JobTrigger.objects.filter(
+                from_config_id=from_config_id, **{f"lifecycle_{lifecycle}": True}
+            )
+            .select_related("from_config__team", "create_config__team")
+            .prefetch_related("rules")
+            .order_by("id")
+        ),
+    )
+
+
+def attach_config(job: Job) -> Job:
+    """
+    Fills in a job's team and config from the cache, unless they are already loaded.
+    """
+    if not Job.team.is_cached(job):
+        job.team = get_team(job.team_id)
+    if job.job_config_id and not Job.job_config.is_cached(job):
+        job.job_config = get_job_config(job.job_config_id)
+    return job
+
+
+def stats() -> Dict[str, Dict[str, int]]:
+    return {
+        kind: {"hits": hits[kind], "misses": misses[kind]}
+        for kind in sorted({*hits, *misses})
+    }
+
+
+def invalidate():
+    """
+    Starts a new generation, so every process reloads from the database.
+    """
+    generation = uuid.uuid4().hex
+    cache.set(GENERATION_KEY, generation, None)
+    _set_local_generation(generation)
+
+
+@receiver([post_save, post_delete], sender=Team)
+@receiver([post_save, post_delete], sender=JobConfig)
+@receiver([post_save, post_delete], sender=JobTrigger)
+@receiver([post_save, post_delete], sender=JobScheduleRule)
+def config_changed(sender, **kwargs):
+    invalidate()
+    # Invalidate again once committed, in case another process reloaded the old
+    # rows in the meantime
+    transaction.on_commit(invalidate)
@@ -0,0 +1,126 @@
+"""
+Explanations are stored on Job.explanation_data as:
+{
+    "version": 1,
+    "config": "Load the dishwasher",
+    "job": "Load the dishwasher",
+    "team": "Test Team",
+    "weights": [random, team, job],
+    "candidates": [
+        ["Full name", "Display name", "2023-01-05", job_balance, team_balance,
+         random, normed_team, normed_job, score, eligible],
+    ],
+    "selected": 0,
+    "unavailable": ["Full name"]
+}
+Each candidate is stored as a list, in the order of the Candidate fields.
+"""
+from typing import Any, Dict, List, NamedTuple, Sequence
+
+from hwk.apps.jobs.scoring import CandidateScores, ScoringPolicy
+
+EXPLANATION_VERSION = 1
+
+
+class Candidate(NamedTuple):
+    full_name: str
+    display_name: str
+    available: str
+    job_balance: int
+    team_balance: int
+    random_value: float
+    normed_team: float
+    normed_job: float
+    score: float
+    eligible: bool
+
+
+def build_explanation(
+    config_name: str,
+    job_name: str,
+    team_name: str,
+    policy: ScoringPolicy,
+    workers: List[Dict[str, Any]],
+    scores: CandidateScores,
+    unavailable: Sequence[Dict[str, Any]] = (),
+) -> Dict[str, Any]:
+    """
+    Records the inputs and outcome of an assignment compactly, for later rendering.
+    """
+    return {
+        "version": EXPLANATION_VERSION,
+        "config": config_name,
+        "job": job_name,
+        "team": team_name,
+        "weights": [
+            policy.random_weight,
+            policy.team_credit_weight,
+            policy.job_credit_weight,
+        ],
+        "candidates": [
+            list(
+                Candidate(
+                    full_name=worker["worker"].user.full_name,
+                    display_name=str(worker["worker"].user),
+                    available=worker["available_date"].isoformat(),
+                    job_balance=worker["job_balance"],
+                    team_balance=worker["team_balance"],
+                    random_value=worker["random_value"],
+                    normed_team=float(scores.normed_team_balance[index]),
+                    normed_job=float(scores.normed_job_balance[index]),
+                    score=float(scores.score[index]),
+                    eligible=bool(scores.eligible[index]),
+                )
+            )
+            for index, worker in enumerate(workers)
+        ],
+        "selected": int(scores.selected),
+        "unavailable": [worker["worker"].user.full_name for worker in unavailable],
+    }
+
+
+def render_explanation(data: Dict[str, Any]) -> str:
+    """
+    Renders a stored explanation as markdown.
+    """
+    random_weight, team_weight, job_weight = data["weights"]
+    candidates = [Candidate._make(candidate) for candidate in data["candidates"]]
+
+    lines = [f"# Scheduling {data['config']}\n"]
+    for candidate in candidates:
+        lines.append(f"\n## {candidate.full_name}\n\n")
+        lines.append(f"- Available from: {candidate.available}\n")
+        lines.append(f"- Has {candidate.job_balance} credit on job {data['job']}\n")
+        lines.append(f"- Has {candidate.team_balance} credit in team {data['team']}\n")
+        lines.append(f"- Gets {candidate.random_value:.2f} random value\n")
+
+    for name in data.get("unavailable", []):
+        lines.append(f"\n## {name}\n\n")
+        lines.append("- Not available within the search horizon\n")
+
+    if not all(candidate.eligible for candidate in candidates):
+        lines.append(
+            "\n## Availability\n\n"
+            "Some candidates were removed due to lack of availability.\n"
+        )
+
+    lines.append(
+        "\n## Scoring\n\n"
+        "| Candidate | Random | Team | Job | Score |\n"
+        "| - | - | - | - | - |\n"
+    )
+    for candidate in candidates:
+        if not candidate.eligible:
+            continue
+        lines.append(
+            f"| {candidate.display_name} |"
+            f"{candidate.random_value:.2f} * {random_weight} |"
+            f"{candidate.normed_team:.2f} * {team_weight} |"
+            f"{candidate.normed_job:.2f} * {job_weight} |"
+            f"{candidate.score:.2f} |\n"
+        )
+
+    selected = candidates[data["selected"]]
+    lines.append(f"\n## Result\n\n{selected.display_name} is selected.\n")
+
+    return "".join(lines)
@@ -0,0 +1,168 @@
+from collections import defaultdict
+from typing import Optional, List, NamedTuple, Dict, Tuple, Iterable
+
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum
+from django.db.models.signals import pre_delete
+from django.dispatch import receiver
+
+from hwk.apps.jobs.models import Job, Credit, CreditBalance, TeamCreditBalance
+from hwk.apps.teams.models import Membership
+
+
+class BalanceDrift(NamedTuple):
+    person_id: int
+    job_config_id: Optional[int]
+    is_team: bool
+    expected: int
+    actual: int
+
+
+def _increment(model, amount: int, create: bool = True, **lookup):
+    """
+    :param create: Whether to create the balance when there is none yet.
+    """
+    updated = model.objects.filter(**lookup).update(amount=F("amount") + amount)
+    if updated or not create:
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(amount=amount, **lookup)
+    except IntegrityError:
+        # Another writer created the row first
+        model.objects.filter(**lookup).update(amount=F("amount") + amount)
+
+
+def record_credit(job: Job, amount: int, person: Membership) -> Credit:
+    """
+    Writes a credit to the ledger and applies it to the running balances.
+
+    :param job: The job the credit was earned on.
+    :param amount: The amount of credit.
+    :param person: The membership receiving the credit.
+    :return: The saved credit.
+    """
+    with transaction.atomic():
+        credit = Credit.objects.create(job=job, amount=amount, person=person)
+        _increment(CreditBalance, amount, person=person, job_config=job.job_config)
+        _increment(TeamCreditBalance, amount, person=person)
+    return credit
+
+
+def record_credits(entries: Iterable[Tuple[Job, int, Membership]]) -> List[Credit]:
+    """
+    Writes several credits to the ledger with one insert, and applies them to the
+    running balances with one update per balance.
+
+    :param entries: The job, amount and receiving membership of each credit.
+    :return: The saved credits.
+    """
+    entries = list(entries)
+    if not entries:
+        return []
+
+    job_amounts = defaultdict(int)
+    team_amounts = defaultdict(int)
+    for job, amount, person in entries:
+        job_amounts[(person.id, job.job_config_id)] += amount
+        team_amounts[person.id] += amount
+
+    with transaction.atomic():
+        credits = Credit.objects.bulk_create(
+            Credit(job=job, amount=amount, person=person)
+            for job, amount, person in entries
+        )
+        for (person_id, job_config_id), amount in job_amounts.items():
+            _increment(
+                CreditBalance, amount, person_id=person_id, job_config_id=job_config_id
+            )
+        for person_id, amount in team_amounts.items():
+            _increment(TeamCreditBalance, amount, person_id=person_id)
+    return credits
+
+
+@receiver(pre_delete, sender=Credit)
+def credit_deleted(sender, instance: Credit, **kwargs):
+    """
+    Takes a deleted credit off the running balances, including credits deleted
+    along with their job, job config or team.
+
+    This runs before anything is deleted, so the job can still be looked up, and
+    balances that are about to be deleted too are never recreated.
+    """
+    job_config_id = (
+        Job.objects.filter(id=instance.job_id)
+        .values_list("job_config_id", flat=True)
+        .first()
+    )
+    _increment(
+        CreditBalance,
+        -instance.amount,
+        create=False,
+        person_id=instance.person_id,
+        job_config_id=job_config_id,
+    )
+    _increment(
+        TeamCreditBalance, -instance.amount, create=False, person_id=instance.person_id
+    )
+
+
+def _expected_balances() -> Tuple[Dict[Tuple[int, Optional[int]], int], Dict[int, int]]:
+    job_totals = {
+        (row["person"], row["job__job_config"]): row["total"]
+        for row in Credit.objects.values("person", "job__job_config").annotate(
+            total=Sum("amount")
+        )
+    }
+    team_totals = {
+        row["person"]: row["total"]
+        for row in Credit.objects.values("person").annotate(total=Sum("amount"))
+    }
+    return job_totals, team_totals
+
+
+def find_drift() -> List[BalanceDrift]:
+    """
+    Compares the stored balances with totals summed from the credit ledger.
+
+    :return: Every balance that does not match the ledger.
+    """
+    job_totals, team_totals = _expected_balances()
+    drift = []
+
+    stored_job = {
+        (row.person_id, row.job_config_id): row.amount
+        for row in CreditBalance.objects.all()
+    }
+    for key in job_totals.keys() | stored_job.keys():
+        expected, actual = job_totals.get(key, 0), stored_job.get(key, 0)
+        if expected != actual:
+            drift.append(BalanceDrift(key[0], key[1], False, expected, actual))
+
+    stored_team = {row.person_id: row.amount for row in TeamCreditBalance.objects.all()}
+    for key in team_totals.keys() | stored_team.keys():
+        expected, actual = team_totals.get(key, 0), stored_team.get(key, 0)
+        if expected != actual:
+            drift.append(BalanceDrift(key, None, True, expected, actual))
+
+    return drift
+
+
+@transaction.atomic
+def rebuild_balances():
+    """
+    Discards the stored balances and recomputes them from the credit ledger.
+    """
+    job_totals, team_totals = _expected_balances()
+
+    CreditBalance.objects.all().delete()
+    TeamCreditBalance.objects.all().delete()
+
+    CreditBalance.objects.bulk_create(
+        CreditBalance(person_id=person_id, job_config_id=job_config_id, amount=total)
+        for (person_id, job_config_id), total in job_totals.items()
+    )
+    TeamCreditBalance.objects.bulk_create(
+        TeamCreditBalance(person_id=person_id, amount=total)
+        for person_id, total in team_totals.items()
+    )
@@ -1,13 +1,29 @@
+import logging
+from collections import deque
 from datetime import timedelta, datetime
-from typing import Optional
+from typing import Optional, List, Deque, Dict, Tuple
 
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, QuerySet
 from django.utils import timezone
+from pydantic import BaseModel
 
 from hwk.apps.jobs.assigner import create_job_from_trigger
-from hwk.apps.jobs.models import Job, JobLifecycle, Credit, JobVariant, JobTrigger
+from hwk.apps.jobs.availability import AvailabilityCache
+from hwk.apps.jobs.config_cache import attach_config, triggers_for
+from hwk.apps.jobs.unit_of_work import TransitionUnit
+from hwk.apps.jobs.models import (
+    Job,
+    JobLifecycle,
+    JobVariant,
+    ACTIVE_STATUSES,
+)
 from hwk.apps.notifications.notify import on_job_change
 from hwk.apps.teams.models import Membership
 
+logger = logging.getLogger(__name__)
+
 
 def get_lifecycle_for_job(job: Job):
     current_status = job.status
@@ -59,10 +75,27 @@ def set_job_status(
     desired_status: JobLifecycle,
     membership: Optional[Membership] = None,
     job_variant: Optional[JobVariant] = None,
+    cascade: Optional["Cascade"] = None,
 ):
+    """
+    Moves a job to a new status, crediting whoever completed it and firing the
+    triggers for the new status.
+
+    :param cascade: The cascade the transition is part of. If not given, the
+        transition and a new cascade for it are written in one transaction.
+    :return: Whether the transition was permitted.
+    """
     if (job.status, desired_status) not in permitted_transitions:
         return False
 
+    if cascade is None:
+        with transaction.atomic():
+            cascade = Cascade(job)
+            set_job_status(job, desired_status, membership, job_variant, cascade)
+            cascade.run()
+        return True
+
+    attach_config(job)
     original_status = job.status
 
     job.status = desired_status
@@ -80,44 +113,193 @@ def set_job_status(
             credit_amount = job.grabbed_rate(credit_amount)
 
         # Apply credit to the right membership
-        Credit(job=job, amount=credit_amount, person=membership).save()
+        cascade.unit.add_credit(job, credit_amount, membership)
 
-    process_triggers(job)
     job.save()
 
     if original_status != desired_status:
-        on_job_change(job)
+        on_job_change(job, cascade.unit)
 
-    return True
+    cascade.push(job)
 
-
-def process_triggers(job: Job):
-    filter_params = {
-        "from_config": job.job_config,
-        f"lifecycle_{job.status.lower()}": True,
-    }
-    triggers = JobTrigger.objects.filter(**filter_params)
-    for trigger in triggers:
-        new_job = create_job_from_trigger(job, trigger)
-        original_status = new_job.status
-        process_job(new_job)
-        if original_status == new_job.status:
-            # Only notify if the job is still scheduled
-            on_job_change(new_job)
+    return True
 
 
-def process_job(job):
+class CascadeSummary(BaseModel):
+    root_job_id: Optional[int]
+    transitions: int = 0
+    created_job_ids: List[int] = []
+    cycle_trigger_ids: List[int] = []
+    max_depth: int = 0
+    truncated: bool = False
+
+
+class Cascade:
+    """
+    Drains the triggers fired by one event, and by the jobs they create, from a
+    work queue rather than by recursion.
+
+    Each job remembers the chain of triggers that created it. A trigger that is
+    already in that chain would loop, so it is skipped and reported. Chains are
+    cut at ``max_depth`` triggers, and the cascade stops creating jobs once it has
+    created ``max_fanout`` of them.
+    """
+
+    def __init__(
+        self,
+        root: Job,
+        max_fanout: Optional[int] = None,
+        max_depth: Optional[int] = None,
+    ):
+        if max_fanout is None:
+            max_fanout = settings.JOB_TRIGGER_MAX_FANOUT
+        if max_depth is None:
+            max_depth = settings.JOB_TRIGGER_MAX_DEPTH
+        self.max_fanout = max_fanout
+        self.max_depth = max_depth
+        self.summary = CascadeSummary(root_job_id=root.id)
+        self.availability = AvailabilityCache()
+        self.unit = TransitionUnit()
+        self._queue: Deque[Job] = deque()
+        self._chains: Dict[int, Tuple[int, ...]] = {}
+
+    def push(self, job: Job):
+        """
+        Queues the triggers for the status the job is now in.
+        """
+        self.summary.transitions += 1
+        self._queue.append(job)
+
+    def run(self) -> CascadeSummary:
+        while self._queue:
+            job = self._queue.popleft()
+            self.unit.write_credits()
+            self._fire_triggers(job)
+        self.unit.flush()
+
+        if self.summary.truncated or self.summary.cycle_trigger_ids:
+            logger.warning("Trigger cascade was cut short: %s", self.summary)
+        elif self.summary.created_job_ids:
+            logger.info("Trigger cascade: %s", self.summary)
+        return self.summary
+
+    def _fire_triggers(self, job: Job):
+        if not job.job_config_id:
+            return
+        chain = self._chains.get(job.id, ())
+
+        for trigger in triggers_for(job.job_config_id, job.status):
+            if trigger.id in chain:
+                self.summary.cycle_trigger_ids.append(trigger.id)
+                continue
+            if (
+                len(chain) >= self.max_depth
+                or len(self.summary.created_job_ids) >= self.max_fanout
+            ):
+                self.summary.truncated = True
+                continue
+
+            new_job = create_job_from_trigger(job, trigger, self.availability)
+            if new_job is None:
+                # No one can take the job within the search horizon
+                continue
+
+            self.summary.created_job_ids.append(new_job.id)
+            self.summary.max_depth = max(self.summary.max_depth, len(chain) + 1)
+            self._chains[new_job.id] = (*chain, trigger.id)
+
+            original_status = new_job.status
+            process_job(new_job, self)
+            if original_status == new_job.status:
+                # Only notify if the job is still scheduled
+                on_job_change(new_job, self.unit)
+
+
+def process_triggers(job: Job) -> CascadeSummary:
+    """
+    Fires the triggers for the job's current status, writing the jobs and
+    notifications they cascade into in one transaction.
+
+    :return: The cascade's summary.
+    """
+    with transaction.atomic():
+        cascade = Cascade(job)
+        cascade.push(job)
+        return cascade.run()
+
+
+def process_job(job, cascade: Optional[Cascade] = None):
+    attach_config(job)
     current_status = job.status
     desired_status = get_lifecycle_for_job(job)
 
     if current_status != desired_status:
-        set_job_status(job, desired_status)
+        set_job_status(job, desired_status, cascade=cascade)
 
 
-def process_jobs():
-    open_jobs = Job.objects.filter(
-        status__in=[JobLifecycle.OPEN, JobLifecycle.OVERDUE, JobLifecycle.SCHEDULED]
+def jobs_to_transition(current_time: Optional[datetime] = None) -> QuerySet[Job]:
+    """
+    Selects, in SQL, the jobs that get_lifecycle_for_job would move through a
+    permitted transition.
+
+    The open and failed boundaries depend on each job's config, so one condition is
+    built for each distinct (open_days, failed_days) pair in use.
+    """
+    current_time = current_time or timezone.now()
+    active = Job.objects.filter(
+        status__in=ACTIVE_STATUSES, due_date__isnull=False, job_config__isnull=False
+    )
+
+    # Past the due date: overdue, or cancelled if also past the failed date
+    crossed = Q(due_date__lt=current_time) & ~Q(status=JobLifecycle.OVERDUE)
+
+    windows = active.values_list(
+        "job_config__open_days", "job_config__failed_days"
+    ).distinct()
+    for open_days, failed_days in windows:
+        # due_date - open_days < now, and due_date + failed_days < now
+        open_before = current_time + timedelta(days=open_days or 3650)
+        failed_before = current_time - timedelta(days=failed_days or 3650)
+        crossed |= Q(
+            job_config__open_days=open_days, job_config__failed_days=failed_days
+        ) & (
+            Q(due_date__lt=failed_before)
+            | Q(status=JobLifecycle.SCHEDULED, due_date__lt=open_before)
+        )
+
+    return active.filter(crossed)
+
+
+def locked_jobs() -> QuerySet[Job]:
+    """
+    Jobs locked for update until the current transaction ends, loaded with their
+    assignees, configs and teams. Only the jobs' rows are locked.
+    """
+    return Job.objects.select_for_update(of=("self",)).select_related(
+        "assignee__user", "job_config", "team"
     )
 
-    for job in open_jobs:
-        process_job(job)
+
+def process_jobs(team_id=None, chunk_size: int = 100) -> int:
+    """
+    Applies every due lifecycle transition, optionally for a single team.
+
+    :return: The number of jobs that were due a transition.
+    """
+    due = jobs_to_transition()
+    if team_id is not None:
+        due = due.filter(team_id=team_id)
+    job_ids = list(due.order_by("id").values_list("id", flat=True))
+
+    for offset in range(0, len(job_ids), chunk_size):
+        # Jobs can be deleted by triggers as earlier chunks are processed, so each
+        # chunk is loaded fresh. Teams and configs come from the config cache.
+        chunk = job_ids[offset : offset + chunk_size]
+        with transaction.atomic():
+            # Locked, so a transition_job task for the same job waits and then
+            # sees the new status rather than applying the transition again
+            jobs = locked_jobs().filter(id__in=chunk)
+            for job in jobs.order_by("id"):
+                process_job(job)
+
+    return len(job_ids)
@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand, CommandError
+
+from hwk.apps.jobs.ledger import find_drift, rebuild_balances
+
+
+class Command(BaseCommand):
+    help = "Rebuilds credit balances from the credit ledger and reports any drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drift, do not rebuild",
+        )
+
+    def handle(self, *args, check=False, **options):
+        drift = find_drift()
+        for item in drift:
+            scope = "team" if item.is_team else f"job config {item.job_config_id}"
+            self.stdout.write(
+                f"Membership {item.person_id} ({scope}): "
+                f"expected {item.expected}, stored {item.actual}"
+            )
+        self.stdout.write(f"{len(drift)} balance(s) drifted from the ledger")
+
+        if check:
+            if drift:
+                raise CommandError("Credit balances have drifted")
+            return
+
+        rebuild_balances()
+
+        if find_drift():
+            raise CommandError("Credit balances still drifted after rebuild")
+        self.stdout.write(self.style.SUCCESS("Credit balances rebuilt"))
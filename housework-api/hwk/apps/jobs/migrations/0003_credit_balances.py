@@ -0,0 +1,96 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:26
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Sum
+
+
+def populate_balances(apps, schema_editor):
+    Credit = apps.get_model("jobs", "Credit")
+    CreditBalance = apps.get_model("jobs", "CreditBalance")
+    TeamCreditBalance = apps.get_model("jobs", "TeamCreditBalance")
+
+    CreditBalance.objects.bulk_create(
+        CreditBalance(
+            person_id=row["person"],
+            job_config_id=row["job__job_config"],
+            amount=row["total"],
+        )
+        for row in Credit.objects.values("person", "job__job_config").annotate(
+            total=Sum("amount")
+        )
+    )
+    TeamCreditBalance.objects.bulk_create(
+        TeamCreditBalance(person_id=row["person"], amount=row["total"])
+        for row in Credit.objects.values("person").annotate(total=Sum("amount"))
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("teams", "0002_alter_invitation_blocked"),
+        ("jobs", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TeamCreditBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.IntegerField(default=0)),
+                (
+                    "person",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="team_credit_balance",
+                        to="teams.membership",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="CreditBalance",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("amount", models.IntegerField(default=0)),
+                (
+                    "job_config",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="credit_balances",
+                        to="jobs.jobconfig",
+                    ),
+                ),
+                (
+                    "person",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="credit_balances",
+                        to="teams.membership",
+                    ),
+                ),
+            ],
+            options={
+                "unique_together": {("person", "job_config")},
+            },
+        ),
+        migrations.RunPython(populate_balances, migrations.RunPython.noop),
+    ]
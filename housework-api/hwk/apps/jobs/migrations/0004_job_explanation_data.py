@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0003_credit_balances"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="explanation_data",
+            field=models.JSONField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:35
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0004_job_explanation_data"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="jobtrigger",
+            name="rules_version",
+            field=models.UUIDField(
+                default=uuid.uuid4,
+                help_text="Replaced whenever the trigger's rules change",
+            ),
+        ),
+    ]
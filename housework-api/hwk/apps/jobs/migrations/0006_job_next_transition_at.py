@@ -0,0 +1,46 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:38
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def populate_next_transition_at(apps, schema_editor):
+    Job = apps.get_model("jobs", "Job")
+
+    jobs = list(
+        Job.objects.filter(
+            status__in=["Scheduled", "Open", "Overdue"],
+            due_date__isnull=False,
+            job_config__isnull=False,
+        ).select_related("job_config")
+    )
+    for job in jobs:
+        if job.status == "Scheduled":
+            days = -(job.job_config.open_days or 3650)
+        elif job.status == "Open":
+            days = 0
+        else:
+            days = job.job_config.failed_days or 3650
+        job.next_transition_at = job.due_date + timedelta(days=days)
+    Job.objects.bulk_update(jobs, ["next_transition_at"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("jobs", "0005_jobtrigger_rules_version"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="job",
+            name="next_transition_at",
+            field=models.DateTimeField(
+                blank=True,
+                db_index=True,
+                help_text="When the job's status is next due to change by itself",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(populate_next_transition_at, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,6 @@
-from typing import Optional, Tuple
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple, Iterable, List
 
 from django.db import models
 from django.utils import timezone
@@ -17,6 +19,9 @@ class JobLifecycle(models.TextChoices):
     CANCELLED = "Cancelled", "Cancelled"
 
 
+ACTIVE_STATUSES = [JobLifecycle.OPEN, JobLifecycle.OVERDUE, JobLifecycle.SCHEDULED]
+
+
 class JobConfig(models.Model):
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="job_configs")
     name = models.CharField(max_length=128)
@@ -29,6 +34,15 @@ class JobConfig(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # open_days and failed_days move the transition times of active jobs
+        jobs = list(self.job_set.filter(status__in=ACTIVE_STATUSES))
+        for job in jobs:
+            job.job_config = self
+            job.next_transition_at = job.transition_time()
+        Job.objects.bulk_update(jobs, ["next_transition_at"])
+
 
 class JobVariant(models.Model):
     job_config = models.ForeignKey(
@@ -51,6 +65,7 @@ class Job(models.Model):
     default_credit = models.PositiveSmallIntegerField()
     description = models.TextField(null=True, blank=True)
     explanation = models.TextField(null=True, blank=True)
+    explanation_data = models.JSONField(null=True, blank=True)
     is_priority = models.BooleanField(default=False)
     created_date = models.DateTimeField(default=timezone.now)
     due_date = models.DateTimeField(null=True, blank=True)
@@ -69,10 +84,36 @@ class Job(models.Model):
         related_name="completed_jobs",
     )
     delay = models.PositiveSmallIntegerField(default=0)
+    next_transition_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        db_index=True,
+        help_text="When the job's status is next due to change by itself",
+    )
 
     def __str__(self):
         return self.name or f"Job {self.name}"
 
+    def save(self, *args, **kwargs):
+        self.next_transition_at = self.transition_time()
+        if kwargs.get("update_fields") is not None:
+            kwargs["update_fields"] = {*kwargs["update_fields"], "next_transition_at"}
+        super().save(*args, **kwargs)
+
+    def transition_time(self) -> Optional[datetime]:
+        """
+        The time after which the job's status moves on without anyone acting on it.
+        """
+        if self.status not in ACTIVE_STATUSES:
+            return None
+        if not self.due_date or not self.job_config:
+            return None
+        if self.status == JobLifecycle.SCHEDULED:
+            return self.due_date - timedelta(days=(self.job_config.open_days or 3650))
+        if self.status == JobLifecycle.OPEN:
+            return self.due_date
+        return self.due_date + timedelta(days=(self.job_config.failed_days or 3650))
+
     def grabbed_rate(self, credits: Optional[int] = None) -> int:
         base = credits or self.default_credit
         if self.status in {JobLifecycle.CANCELLED, JobLifecycle.COMPLETE}:
@@ -84,40 +125,55 @@ class Job(models.Model):
 
         return max(0, int(base + rate_diff))
 
-    def as_notification(self, member: Membership) -> Tuple[EventType, Notification]:
-        event_type = EventType.JOB_SCHEDULED
-        if self.status == JobLifecycle.SCHEDULED:
-            event_type = EventType.JOB_SCHEDULED
-        elif self.status == JobLifecycle.OPEN:
-            event_type = EventType.JOB_OPEN
-        elif self.status == JobLifecycle.OVERDUE:
-            event_type = EventType.JOB_OVERDUE
-        elif self.status == JobLifecycle.COMPLETE:
-            event_type = EventType.JOB_COMPLETE
-        elif self.status == JobLifecycle.CANCELLED:
-            event_type = EventType.JOB_CANCELLED
+    def notification_event(self) -> EventType:
+        if self.status == JobLifecycle.OPEN:
+            return EventType.JOB_OPEN
+        if self.status == JobLifecycle.OVERDUE:
+            return EventType.JOB_OVERDUE
+        if self.status == JobLifecycle.COMPLETE:
+            return EventType.JOB_COMPLETE
+        if self.status == JobLifecycle.CANCELLED:
+            return EventType.JOB_CANCELLED
+        return EventType.JOB_SCHEDULED
+
+    def as_notifications(self, members: Iterable[Membership]) -> List[Notification]:
+        """
+        Builds each member's notification of the job's current status.
+
+        The parts shared by every member are rendered once. Members are expected to
+        be loaded with their users, and are used to name the assignee and whoever
+        completed the job without further queries.
+        """
+        members = list(members)
+        by_id = {member.id: member for member in members}
+        status = str(self.status).lower()
         url = f"/jobs/{self.id}/"
         body = f"{self.name} ({self.team.name})"
 
-        if self.completed_by:
-            if member.id == self.completed_by:
-                title = f"Job {str(self.status).lower()} by you"
-            else:
-                title = f"Job {str(self.status).lower()} by {self.completed_by.user}"
-        elif self.assignee:
-            if member.id == self.assignee.id:
-                title = f"Job is {str(self.status).lower()} for you"
-            else:
-                title = f"Job is {str(self.status).lower()} for {self.assignee.user}"
+        if self.completed_by_id:
+            completed_by = by_id.get(self.completed_by_id) or self.completed_by
+            others = f"Job {status} by {completed_by.user}"
+            own, own_id = f"Job {status} by you", self.completed_by_id
+        elif self.assignee_id:
+            assignee = by_id.get(self.assignee_id) or self.assignee
+            others = f"Job is {status} for {assignee.user}"
+            own, own_id = f"Job is {status} for you", self.assignee_id
         else:
-            title = f"Unassigned job is {str(self.status).lower()}"
+            others = own = f"Unassigned job is {status}"
+            own_id = None
+
+        return [
+            Notification(
+                recipient_id=member.user_id,
+                url=url,
+                title=own if member.id == own_id else others,
+                body=body,
+            )
+            for member in members
+        ]
 
-        return event_type, Notification(
-            recipient=member.user,
-            url=url,
-            title=title,
-            body=body,
-        )
+    def as_notification(self, member: Membership) -> Tuple[EventType, Notification]:
+        return self.notification_event(), self.as_notifications([member])[0]
 
 
 class JobTriggerExistingPolicy(models.TextChoices):
@@ -146,6 +202,9 @@ class JobTrigger(models.Model):
     lifecycle_cancelled = models.BooleanField(default=False)
 
     urgent = models.BooleanField(default=False)
+    rules_version = models.UUIDField(
+        default=uuid.uuid4, help_text="Replaced whenever the trigger's rules change"
+    )
 
     def __str__(self):
         return f"Trigger from {self.from_config} to create {self.create_config}"
@@ -176,3 +235,37 @@ class Credit(models.Model):
         return (
             f"{self.person} got {self.amount} from {self.job} on {self.job.closed_date}"
         )
+
+
+class CreditBalance(models.Model):
+    """Running total of a member's credit on a single job config"""
+
+    person = models.ForeignKey(
+        to=Membership, on_delete=models.CASCADE, related_name="credit_balances"
+    )
+    job_config = models.ForeignKey(
+        to=JobConfig,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="credit_balances",
+    )
+    amount = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("person", "job_config")
+
+    def __str__(self):
+        return f"{self.person} has {self.amount} on {self.job_config}"
+
+
+class TeamCreditBalance(models.Model):
+    """Running total of a member's credit across the whole team"""
+
+    person = models.OneToOneField(
+        to=Membership, on_delete=models.CASCADE, related_name="team_credit_balance"
+    )
+    amount = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.person} has {self.amount} in {self.person.team}"
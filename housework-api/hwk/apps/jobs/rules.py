@@ -1,17 +1,33 @@
 import json
+import uuid
 from abc import abstractmethod
-from datetime import date, timedelta, datetime
+from calendar import monthrange
+from datetime import date, timedelta, datetime, MAXYEAR
 from enum import Enum
-from typing import Generator, List, Tuple, Dict
+from typing import Generator, List, Tuple, Dict, Optional
+from uuid import UUID
 
+import numpy as np
+from django.conf import settings
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone
 from pydantic import BaseModel, constr, root_validator, ValidationError, validator
 
+from hwk.apps.jobs.config_cache import triggers_for
 from hwk.apps.jobs.models import Job, JobScheduleRule, JobTrigger, JobConfig
+from hwk.apps.people.holidays import HolidayIndex
 from hwk.apps.people.models import HwkUser
 from hwk.apps.teams.models import Membership
 
 
+MAX_DAYS_SINCE = 10 * 366
+
+
+def first_candidate_date(delay=0) -> date:
+    return date.today() + timedelta(days=delay + 1)
+
+
 def generate_dates_from_today(delay=0) -> Generator[date, None, None]:
     """
     A generator that yields dates starting from today, continuing indefinitely.
@@ -19,7 +35,7 @@ def generate_dates_from_today(delay=0) -> Generator[date, None, None]:
     Yields:
         date: The next date starting from today.
     """
-    current_date = date.today() + timedelta(days=delay + 1)
+    current_date = first_candidate_date(delay=delay)
     while True:
         yield current_date
         current_date += timedelta(days=1)
@@ -48,6 +64,23 @@ class RuleFilter(BaseModel):
     ) -> Generator[date, None, None]:
         """"""
 
+    @abstractmethod
+    def next_date(self, trigger: Job, day: date) -> Optional[date]:
+        """
+        Returns the first date on or after ``day`` that satisfies the rule, or None
+        if there is no such date.
+        """
+
+    @abstractmethod
+    def date_mask(self, trigger: Job, dates: np.ndarray) -> np.ndarray:
+        """
+        Returns a boolean array marking which of ``dates`` (a ``datetime64[D]``
+        array) satisfy the rule.
+        """
+
+    def is_satisfiable(self) -> bool:
+        return True
+
 
 class RuleDayInWeek(RuleFilter):
     days: List[WeekDay]
@@ -70,9 +103,8 @@ class RuleDayInWeek(RuleFilter):
             return f"On {days_pre} or {days_post}s"
         return "Never"
 
-    def __call__(
-        self, trigger: Job, dates: Generator[date, None, None]
-    ) -> Generator[date, None, None]:
+    @property
+    def day_nums(self) -> List[int]:
         # Map day names to weekday numbers
         day_to_num = {
             WeekDay.MONDAY: 0,
@@ -85,32 +117,64 @@ class RuleDayInWeek(RuleFilter):
         }
 
         # Convert day names to numbers
-        day_nums = [day_to_num[day] for day in self.days if day in day_to_num]
+        return [day_to_num[day] for day in self.days if day in day_to_num]
+
+    def __call__(
+        self, trigger: Job, dates: Generator[date, None, None]
+    ) -> Generator[date, None, None]:
+        day_nums = self.day_nums
 
         # Yield dates where the weekday is in day_nums
         for day in dates:
             if day.weekday() in day_nums:
                 yield day
 
+    def next_date(self, trigger: Job, day: date) -> Optional[date]:
+        offsets = [(num - day.weekday()) % 7 for num in self.day_nums]
+        if not offsets:
+            return None
+        return day + timedelta(days=min(offsets))
+
+    def date_mask(self, trigger: Job, dates: np.ndarray) -> np.ndarray:
+        # 1970-01-01, day zero of datetime64, was a Thursday
+        weekdays = (dates.astype(np.int64) + 3) % 7
+        return np.isin(weekdays, self.day_nums)
+
 
 class RuleDaysSince(RuleFilter):
     days: int
     event: ValidEvent
 
-    def __call__(
-        self, trigger: Job, dates: Generator[date, None, None]
-    ) -> Generator[date, None, None]:
+    @validator('days')
+    def check_days_in_range(cls, v):
+        # Far larger gaps run dates off the end of the calendar
+        if abs(v) > MAX_DAYS_SINCE:
+            raise ValueError(f"Days must be at most {MAX_DAYS_SINCE}")
+        return v
+
+    def earliest_date(self, trigger: Job) -> date:
         event_date_attr = f"{self.event.value}_date"
         reference_date = getattr(trigger, event_date_attr, timezone.now()) or timezone.now()
 
         # Calculate the earliest date to start yielding from
-        earliest_date = reference_date.date() + timedelta(days=self.days)
+        return reference_date.date() + timedelta(days=self.days)
+
+    def __call__(
+        self, trigger: Job, dates: Generator[date, None, None]
+    ) -> Generator[date, None, None]:
+        earliest_date = self.earliest_date(trigger)
 
         # Yield dates that are on or after the earliest date
         for current_date in dates:
             if current_date >= earliest_date:
                 yield current_date
 
+    def next_date(self, trigger: Job, day: date) -> Optional[date]:
+        return max(day, self.earliest_date(trigger))
+
+    def date_mask(self, trigger: Job, dates: np.ndarray) -> np.ndarray:
+        return dates >= np.datetime64(self.earliest_date(trigger), "D")
+
     @property
     def summary(self):
         # Describing the rule based on the number of days
@@ -136,6 +200,22 @@ def format_date(month, day):
     return f"{month_name} {day}{suffix}"
 
 
+def first_date_on_or_after(year: int, month: int, day: int) -> Optional[date]:
+    """
+    Returns the first real date in the year whose (month, day) is on or after the one
+    given, which need not be a real date itself (e.g. 02-30 gives March 1st).
+    """
+    if month > 12:
+        return None
+    if month < 1:
+        return date(year, 1, 1)
+    if day < 1:
+        return date(year, month, 1)
+    if day > monthrange(year, month)[1]:
+        return first_date_on_or_after(year, month + 1, 1)
+    return date(year, month, day)
+
+
 class RuleDayInYear(RuleFilter):
     gte: constr(regex=r"^\d{2}-\d{2}$")
     lte: constr(regex=r"^\d{2}-\d{2}$")
@@ -169,6 +249,37 @@ class RuleDayInYear(RuleFilter):
             if self.is_date_within_range(current_date):
                 yield current_date
 
+    def next_date(self, trigger: Job, day: date) -> Optional[date]:
+        if self.is_date_within_range(day):
+            return day
+
+        # Within a year, matching dates are runs starting on January 1st or on the
+        # first date on or after gte, so only those need checking. Leap days can
+        # take up to 8 years to come round.
+        for year in range(day.year, min(day.year + 9, MAXYEAR + 1)):
+            for start in (date(year, 1, 1), first_date_on_or_after(year, *self._gte_tuple)):
+                if start is None:
+                    continue
+                start = max(day, start)
+                if self.is_date_within_range(start):
+                    return start
+        return None
+
+    def date_mask(self, trigger: Job, dates: np.ndarray) -> np.ndarray:
+        months = dates.astype("datetime64[M]")
+        month_days = (months.astype(np.int64) % 12 + 1) * 100
+        month_days += (dates - months).astype(np.int64) + 1
+        gte = self._gte_tuple[0] * 100 + self._gte_tuple[1]
+        lte = self._lte_tuple[0] * 100 + self._lte_tuple[1]
+
+        if gte <= lte:
+            return (month_days >= gte) & (month_days <= lte)
+        return (month_days >= gte) | (month_days <= lte)
+
+    def is_satisfiable(self) -> bool:
+        # 2000 is a leap year, so the scan covers February 29th
+        return self.next_date(None, date(2000, 1, 1)) is not None
+
     @property
     def summary(self):
         if self._gte_tuple > self._lte_tuple:
@@ -189,26 +300,117 @@ def get_function(rule: JobScheduleRule):
 def validate_rule(rule: JobScheduleRule):
     function = get_function(rule)
     try:
-        return True, function(**rule.params).summary
+        with_args = function(**rule.params)
     except ValidationError as e:
         return False, str(e)
+    if not with_args.is_satisfiable():
+        return False, f"Rule can never be satisfied: {with_args.summary}"
+    return True, with_args.summary
 
 
-def schedule_for_user(trigger: JobTrigger, job: Job, membership: Membership):
-    all_dates = generate_dates_from_today(delay=job.delay)
-    available_dates = membership.dates_not_on_holiday(all_dates)
+def validate_rule_set(rules: List[JobScheduleRule]):
+    """
+    Checks that a trigger's rules can be satisfied together.
 
-    for rule in trigger.rules.all():
-        function = get_function(rule)
-        with_args = function(**rule.params)
-        available_dates = with_args(job, available_dates)
+    The weekday and day-in-year calendar repeats within 28 years (outside of century
+    years), so a rule set with no matching date in that window never matches.
+    """
+    for rule in rules:
+        valid, message = validate_rule(rule)
+        if not valid:
+            return False, message
+
+    filters = [get_function(rule)(**rule.params) for rule in rules]
+    job = Job()
+    start = first_candidate_date()
+    offset = max((_.days for _ in filters if isinstance(_, RuleDaysSince)), default=0)
+    until = start + timedelta(days=offset + 28 * 366)
+    if solve_next_date(filters, job, start, until=until) is None:
+        return False, "Rules can never be satisfied together"
+    return True, None
+
+
+def solve_next_date(
+    rules: List[RuleFilter],
+    job: Job,
+    start: date,
+    holidays: Optional[HolidayIndex] = None,
+    until: Optional[date] = None,
+) -> Optional[date]:
+    """
+    Finds the first date on or after ``start`` that satisfies every rule and is not
+    on holiday, by jumping each rule forward in turn until none of them move.
+
+    Gives the same date as chaining the rule generators, without stepping through
+    every day in between.
+
+    :param until: If given, give up and return None once past this date.
+    """
+    current = start
+    try:
+        while until is None or current <= until:
+            previous = current
+            if holidays is not None:
+                current = holidays.next_free_date(current)
+            for rule in rules:
+                current = rule.next_date(job, current)
+                if current is None:
+                    return None
+            if current == previous:
+                return current
+    except OverflowError:
+        # Rules that can never agree run off the end of the calendar
+        pass
+    return None
+
+
+def rules_date_mask(rules: List[RuleFilter], job: Job, dates: np.ndarray) -> np.ndarray:
+    """
+    Marks which of ``dates`` satisfy every rule.
+    """
+    mask = np.ones(dates.shape, dtype=bool)
+    for rule in rules:
+        mask &= rule.date_mask(job, dates)
+    return mask
+
+
+# Compiled rule chains, by trigger id, as (rules_version, rules)
+_compiled_rules: Dict[int, Tuple[UUID, List[RuleFilter]]] = {}
+
+
+def build_rules(trigger: JobTrigger) -> List[RuleFilter]:
+    """
+    Returns the trigger's rules as filters, compiled once per process for each
+    version of the trigger's rules.
+    """
+    cached = _compiled_rules.get(trigger.id)
+    if cached is not None and cached[0] == trigger.rules_version:
+        return cached[1]
+
+    rules = [get_function(rule)(**rule.params) for rule in trigger.rules.all()]
+    _compiled_rules[trigger.id] = (trigger.rules_version, rules)
+    return rules
 
-    return next(available_dates)
+
+@receiver([post_save, post_delete], sender=JobScheduleRule)
+def rules_changed(sender, instance: JobScheduleRule, **kwargs):
+    """
+    Stamps the trigger with a new rules version, so every process recompiles them.
+    """
+    version = uuid.uuid4()
+    JobTrigger.objects.filter(id=instance.trigger_id).update(rules_version=version)
+    if JobScheduleRule.trigger.is_cached(instance):
+        instance.trigger.rules_version = version
+    _compiled_rules.pop(instance.trigger_id, None)
+
+
+def search_until(start: date) -> date:
+    return start + timedelta(days=settings.JOB_RULE_SEARCH_HORIZON_DAYS)
 
 
 class DryRunOutcome(BaseModel):
     created_job: JobConfig
-    proposed_date: date
+    proposed_date: Optional[date]
     trigger: JobTrigger
 
     class Config:
@@ -216,23 +418,18 @@ class DryRunOutcome(BaseModel):
 
 
 def dry_run_trigger(trigger: JobTrigger, job: Job, delay: int) -> DryRunOutcome:
-    rules = trigger.rules.all()
-
-    available_dates: Generator[date, None, None] = generate_dates_from_today(delay=delay)
-    for rule in rules:
-        function = get_function(rule)
-        with_args = function(**rule.params)
-        available_dates = with_args(job, available_dates)
+    start = first_candidate_date(delay=delay)
+    proposed_date = solve_next_date(
+        build_rules(trigger), job, start, until=search_until(start)
+    )
 
-    return DryRunOutcome(trigger=trigger, created_job=trigger.create_config, proposed_date=next(available_dates))
+    return DryRunOutcome(trigger=trigger, created_job=trigger.create_config, proposed_date=proposed_date)
 
 
 def dry_run(job: Job, delay: int, action: str):
-    config = job.job_config
-    filter_params = {
-        f"lifecycle_{action.lower()}": True,
-    }
-    triggers = JobTrigger.objects.filter(**filter_params)
-    if config is None:
+    if job.job_config_id is None:
         return []
-    return [dry_run_trigger(job=job, trigger=_, delay=delay) for _ in config.trigger_from.filter(**filter_params)]
+    return [
+        dry_run_trigger(job=job, trigger=_, delay=delay)
+        for _ in triggers_for(job.job_config_id, action)
+    ]
@@ -0,0 +1,107 @@
+from typing import NamedTuple, Union
+
+import numpy as np
+
+from hwk.apps.teams.models import Team, HolidayPolicy
+
+ArrayLike = Union[np.ndarray, float, int, bool]
+
+
+class ScoringPolicy(NamedTuple):
+    """
+    The team policy values used to score candidates.
+
+    Each value may be a scalar, or an array broadcastable against the candidate
+    arrays (e.g. shape ``(n_triggers, 1)``) to score several teams at once.
+    """
+
+    max_team_diff: ArrayLike
+    max_job_diff: ArrayLike
+    random_weight: ArrayLike
+    team_credit_weight: ArrayLike
+    job_credit_weight: ArrayLike
+
+    @classmethod
+    def from_team(cls, team: Team) -> "ScoringPolicy":
+        return cls(
+            max_team_diff=team.policy_max_team_diff,
+            max_job_diff=team.policy_max_job_diff,
+            random_weight=team.policy_random_weight,
+            team_credit_weight=team.policy_team_credit_weight,
+            job_credit_weight=team.policy_job_credit_weight,
+        )
+
+
+class CandidateScores(NamedTuple):
+    normed_team_balance: np.ndarray
+    normed_job_balance: np.ndarray
+    eligible: np.ndarray
+    score: np.ndarray
+    selected: np.ndarray
+
+
+def restricts_to_earliest(team: Team, urgent: bool) -> bool:
+    """
+    Whether only the candidates available soonest may be selected.
+    """
+    return urgent or team.policy_when_on_holiday == HolidayPolicy.FIND_OTHER
+
+
+def normalise(values: np.ndarray, max_value: ArrayLike) -> np.ndarray:
+    """
+    Scales values relative to the smallest in each row, capped at 1.
+    """
+    values = np.asarray(values, dtype=float)
+    min_value = values.min(axis=-1, keepdims=True)
+    return np.minimum(1, (values - min_value) / max_value)
+
+
+def score_candidates(
+    policy: ScoringPolicy,
+    day_offset: np.ndarray,
+    team_balance: np.ndarray,
+    job_balance: np.ndarray,
+    random_value: np.ndarray,
+    restrict_to_earliest: ArrayLike = False,
+) -> CandidateScores:
+    """
+    Scores candidates and selects the lowest scoring one.
+
+    Candidate arrays are indexed ``[..., candidate]``, so a 1-d array scores the
+    candidates for a single trigger and a 2-d array scores one trigger per row.
+    Ties are broken in favour of the first candidate.
+
+    :param policy: The weights and normalisation limits to apply.
+    :param day_offset: The day each candidate is available from, as an integer.
+    :param team_balance: Each candidate's credit balance in the team.
+    :param job_balance: Each candidate's credit balance on the job.
+    :param random_value: A random draw in [0, 1) for each candidate.
+    :param restrict_to_earliest: Whether only the candidates with the smallest
+        ``day_offset`` may be selected, as a scalar or one value per row.
+    :return: The intermediate values, the score and the selected index per row.
+    """
+    day_offset = np.asarray(day_offset)
+    random_value = np.asarray(random_value, dtype=float)
+
+    normed_team_balance = normalise(team_balance, policy.max_team_diff)
+    normed_job_balance = normalise(job_balance, policy.max_job_diff)
+
+    earliest = day_offset == day_offset.min(axis=-1, keepdims=True)
+    restrict = np.asarray(restrict_to_earliest, dtype=bool)
+    if restrict.ndim:
+        restrict = restrict[..., np.newaxis]
+    eligible = earliest | ~restrict
+
+    score = random_value * policy.random_weight
+    score = score + normed_team_balance * policy.team_credit_weight
+    score = score + normed_job_balance * policy.job_credit_weight
+
+    selected = np.argmin(np.where(eligible, score, np.inf), axis=-1)
+
+    return CandidateScores(
+        normed_team_balance=normed_team_balance,
+        normed_job_balance=normed_job_balance,
+        eligible=eligible,
+        score=score,
+        selected=selected,
+    )
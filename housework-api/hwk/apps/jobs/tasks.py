@@ -1,14 +1,142 @@
+import time
+from contextlib import contextmanager
 from datetime import timedelta
 
-from celery import shared_task
+from celery import shared_task, group
+from celery.utils.log import get_task_logger
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
 from django.utils import timezone
 
-from hwk.apps.jobs.lifecycle import process_jobs
-from hwk.apps.notifications.models import Notification
+from hwk.apps.jobs import config_cache
+from hwk.apps.jobs.lifecycle import (
+    jobs_to_transition,
+    locked_jobs,
+    process_job,
+    process_jobs,
+)
+from hwk.apps.jobs.models import Job
+from hwk.apps.notifications.retention import purge_notifications
+
+logger = get_task_logger(__name__)
+
+# How often schedule_transitions runs, and so how far ahead it queues
+TRANSITION_SCHEDULE_INTERVAL = timedelta(minutes=5)
+
+TEAM_LOCK_KEY = "hwk.housekeeping.team.{team_id}"
+TRANSITION_QUEUED_KEY = "hwk.transitions.queued.{job_id}.{at}"
+# How often housekeeping runs, in seconds
+HOUSEKEEPING_INTERVAL = 60 * 60
+
+
+def _acquire(key: str) -> bool:
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_try_advisory_lock(hashtext(%s))", [key])
+            return cursor.fetchone()[0]
+    return cache.add(key, True, settings.CELERY_TASK_TIME_LIMIT)
+
+
+def _release(key: str):
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_unlock(hashtext(%s))", [key])
+    else:
+        cache.delete(key)
+
+
+@contextmanager
+def team_lock(team_id):
+    """
+    Holds a lock on a team's housekeeping, yielding whether it was acquired.
+
+    On PostgreSQL this is a session advisory lock, which every worker sees and
+    which is released if the worker's connection is lost. Other databases are
+    only used in development, where a lock in the cache stands in for it, and
+    expires with the task time limit in case a worker dies holding it.
+    """
+    key = TEAM_LOCK_KEY.format(team_id=team_id)
+    acquired = _acquire(key)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            _release(key)
 
 
 @shared_task
 def housekeeping():
-    process_jobs()
-    # Delete old notifications
-    Notification.objects.filter(date_read__lt=timezone.now() - timedelta(hours=12)).delete()
+    # Safety net for any transitions the scheduled tasks missed, fanned out so
+    # each team is processed by its own task
+    team_ids = jobs_to_transition().order_by().values_list("team_id", flat=True).distinct()
+    group(housekeeping_team.s(str(team_id)) for team_id in team_ids).apply_async()
+
+    report = purge_notifications()
+    logger.info(
+        "Purged %d read and %d unread notification(s) in %.2fs%s",
+        report.read,
+        report.unread,
+        report.seconds,
+        "" if report.complete else ", more remain",
+    )
+    return report._asdict()
+
+
+@shared_task
+def housekeeping_team(team_id: str):
+    with team_lock(team_id) as acquired:
+        if not acquired:
+            logger.info("Team %s housekeeping is already running, skipping", team_id)
+            return {"team": team_id, "skipped": True}
+
+        started = time.monotonic()
+        transitions = process_jobs(team_id=team_id)
+        duration = time.monotonic() - started
+
+    logger.info(
+        "Team %s housekeeping processed %d job(s) in %.2fs, config cache: %s",
+        team_id,
+        transitions,
+        duration,
+        config_cache.stats(),
+    )
+    return {"team": team_id, "transitions": transitions, "seconds": duration}
+
+
+@shared_task
+def transition_job(job_id):
+    with transaction.atomic():
+        job = locked_jobs().filter(id=job_id).first()
+        # Another task or housekeeping may have moved the job on while this one
+        # was queued
+        if job is None or job.next_transition_at is None:
+            return
+        if job.next_transition_at > timezone.now():
+            return
+        process_job(job)
+
+
+@shared_task
+def schedule_transitions():
+    """
+    Queues a transition_job task to run as each job reaches its next transition.
+
+    Jobs already past their transition are queued to run straight away. A job is
+    only queued once for each transition time, so jobs waiting on a busy worker
+    are not queued again on every run.
+    """
+    now = timezone.now()
+    upcoming = Job.objects.filter(
+        next_transition_at__lt=now + TRANSITION_SCHEDULE_INTERVAL
+    ).values_list("id", "next_transition_at")
+    for job_id, next_transition_at in upcoming:
+        # Statuses change once the boundary has passed, not on it
+        eta = next_transition_at + timedelta(seconds=1)
+        key = TRANSITION_QUEUED_KEY.format(
+            job_id=job_id, at=int(next_transition_at.timestamp())
+        )
+        # Kept until housekeeping has had a chance to pick the job up instead
+        timeout = max((eta - now).total_seconds(), 0) + HOUSEKEEPING_INTERVAL
+        if cache.add(key, True, timeout):
+            transition_job.apply_async((job_id,), eta=eta)
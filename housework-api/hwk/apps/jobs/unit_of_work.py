@@ -0,0 +1,40 @@
+from typing import List, Tuple
+
+from hwk.apps.jobs.ledger import record_credits
+from hwk.apps.jobs.models import Job
+from hwk.apps.notifications.models import Notification
+from hwk.apps.notifications.tasks import send_on_commit
+from hwk.apps.teams.models import Membership
+
+
+class TransitionUnit:
+    """
+    Gathers the credits and notifications of a transition and its trigger cascade,
+    so they are written with bulk inserts rather than one at a time.
+
+    Delivery of the notifications is queued for when the surrounding transaction
+    commits.
+    """
+
+    def __init__(self):
+        self.credits: List[Tuple[Job, int, Membership]] = []
+        self.notifications: List[Notification] = []
+
+    def add_credit(self, job: Job, amount: int, person: Membership):
+        self.credits.append((job, amount, person))
+
+    def add_notification(self, notification: Notification):
+        self.notifications.append(notification)
+
+    def write_credits(self):
+        """
+        Writes the pending credits, which must be in the balances before triggers
+        choose who to assign new jobs to.
+        """
+        record_credits(self.credits)
+        self.credits = []
+
+    def flush(self):
+        self.write_credits()
+        send_on_commit(Notification.objects.bulk_create(self.notifications))
+        self.notifications = []
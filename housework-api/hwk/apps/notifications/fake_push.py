@@ -0,0 +1,90 @@
+import base64
+import os
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+from typing import Any, Dict
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def generate_vapid_private_key() -> str:
+    """
+    A new VAPID private key, in the raw form WEBPUSH_VAPID_PRIVATE is given in.
+    """
+    key = ec.generate_private_key(ec.SECP256R1())
+    return _b64(key.private_numbers().private_value.to_bytes(32, "big"))
+
+
+class FakePushServer:
+    """
+    A local push service for testing and benchmarking delivery.
+
+    Pushes to ``/push/<n>`` are accepted after ``latency`` seconds. Pushes to
+    ``/gone/<n>`` are answered with 410, as a push service does for an expired
+    subscription.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.received = 0
+        self._lock = Lock()
+        self._subscriptions = 0
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                time.sleep(server.latency)
+                with server._lock:
+                    server.received += 1
+                status = 410 if self.path.startswith("/gone/") else 201
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def subscription(self, gone: bool = False) -> Dict[str, Any]:
+        """
+        A browser subscription to this server, with real encryption keys.
+        """
+        with self._lock:
+            self._subscriptions += 1
+            number = self._subscriptions
+        key = ec.generate_private_key(ec.SECP256R1())
+        public_key = key.public_key().public_bytes(
+            serialization.Encoding.X962, serialization.PublicFormat.UncompressedPoint
+        )
+        return {
+            "endpoint": f"{self.url}/{'gone' if gone else 'push'}/{number}",
+            "keys": {"p256dh": _b64(public_key), "auth": _b64(os.urandom(16))},
+        }
+
+    def __enter__(self) -> "FakePushServer":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._server.shutdown()
+        self._server.server_close()
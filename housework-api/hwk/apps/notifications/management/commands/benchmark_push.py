@@ -0,0 +1,45 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.test import override_settings
+
+from hwk.apps.notifications.fake_push import FakePushServer, generate_vapid_private_key
+from hwk.apps.notifications.push import PushMessage, push_many
+
+
+class Command(BaseCommand):
+    help = "Measures web push delivery throughput against a local fake push server"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=200)
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Seconds the fake push service takes to answer each push",
+        )
+        parser.add_argument("--concurrency", type=int, default=None)
+
+    def handle(self, *args, messages=200, latency=0.05, concurrency=None, **options):
+        concurrency = concurrency or settings.WEBPUSH_CONCURRENCY
+
+        with FakePushServer(latency=latency) as server, override_settings(
+            WEBPUSH_VAPID_PRIVATE=generate_vapid_private_key(),
+            WEBPUSH_CONCURRENCY=concurrency,
+        ):
+            batch = [
+                PushMessage(index, server.subscription(), '{"title": "Benchmark"}')
+                for index in range(messages)
+            ]
+
+            started = time.monotonic()
+            outcomes = push_many(batch)
+            duration = time.monotonic() - started
+
+        delivered = sum(outcome.delivered for outcome in outcomes)
+        self.stdout.write(
+            f"Delivered {delivered}/{messages} pushes in {duration:.2f}s "
+            f"({messages / duration:.1f}/s, concurrency {concurrency}, "
+            f"latency {latency * 1000:.0f}ms)"
+        )
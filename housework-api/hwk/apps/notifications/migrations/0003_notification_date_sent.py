@@ -0,0 +1,30 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:49
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def mark_existing_sent(apps, schema_editor):
+    # Existing notifications were pushed when they were created, so must not be
+    # picked up by a digest
+    Notification = apps.get_model("notifications", "Notification")
+    Notification.objects.update(date_sent=F("date_created"))
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("notifications", "0002_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="notification",
+            name="date_sent",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When the notification was pushed, on its own or in a digest",
+                null=True,
+            ),
+        ),
+        migrations.RunPython(mark_existing_sent, migrations.RunPython.noop),
+    ]
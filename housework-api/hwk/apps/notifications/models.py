@@ -1,11 +1,12 @@
 import json
+from collections import defaultdict
+from typing import Iterable
 
 from celery import current_app, shared_task
-from django.conf import settings
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
-from pywebpush import webpush, WebPushException
 
+from hwk.apps.notifications.push import PushMessage, push_many
 from hwk.apps.people.models import HwkUser
 
 
@@ -24,37 +25,19 @@ class SubscriptionChannel(models.Model):
         unique_together = ('name', 'channel_type',)
 
 
-def browser_push(channel: SubscriptionChannel, notification: 'Notification'):
-    sub = channel.config
-    try:
-        webpush(sub,
-            json.dumps({
-                "url": notification.url,
-                "title": notification.title,
-                "body": notification.body,
-                "id": notification.id,
-            }),
-            vapid_private_key=settings.WEBPUSH_VAPID_PRIVATE,
-            vapid_claims={
-                "sub": "mailto:webmaster@tdn.sh"
-            }
-        )
-        return True
-    except WebPushException as e:
-        try:
-            if e.response.body["code"] in [410, 401, 403, 404]:
-                return False
-        except Exception as e:
-            return True
-    except Exception as e:
-        return True
-
-
+# Kept for tasks queued before deliveries were batched
 @shared_task
 def send_notification(id):
     Notification.objects.get(id=id).send()
 
 
+@shared_task
+def send_notifications(ids):
+    notifications = list(Notification.objects.filter(id__in=ids))
+    Notification.objects.filter(id__in=ids).update(date_sent=timezone.now())
+    deliver(notifications)
+
+
 class Notification(models.Model):
     recipient = models.ForeignKey(HwkUser, on_delete=models.CASCADE)
     url = models.TextField(max_length=128)
@@ -62,15 +45,60 @@ class Notification(models.Model):
     body = models.TextField()
     date_read = models.DateTimeField(blank=True, null=True)
     date_created = models.DateTimeField(default=timezone.now)
+    date_sent = models.DateTimeField(
+        blank=True,
+        null=True,
+        help_text="When the notification was pushed, on its own or in a digest",
+    )
+
+    class Meta:
+        indexes = [
+            # The unread list, and purging read notifications
+            models.Index(fields=["recipient", "date_read"]),
+            models.Index(fields=["date_read"]),
+        ]
 
     def bg_send(self):
-        send_notification.delay(self.id)
+        """
+        Sends the notification once committed, on its own rather than in a digest.
+        """
+        transaction.on_commit(lambda: send_notifications.delay([self.id]))
 
     def send(self):
-        delete_channels = []
-        for channel in self.recipient.subscription_channels.all():
-            if channel.channel_type == SubscriptionChannelType.BROWSER_PUSH:
-                if not browser_push(channel, self):
-                    delete_channels.append(channel)
-        for channel in delete_channels:
-            channel.delete()
+        deliver([self])
+
+    def as_push_data(self) -> str:
+        return json.dumps(
+            {
+                "url": self.url,
+                "title": self.title,
+                "body": self.body,
+                "id": self.id,
+            }
+        )
+
+
+def deliver(notifications: Iterable[Notification]):
+    """
+    Pushes each notification to its recipient's enabled channels concurrently, then
+    removes every channel the push services reported as gone with one delete.
+    """
+    notifications = list(notifications)
+    channels = defaultdict(list)
+    for channel in SubscriptionChannel.objects.filter(
+        recipient_id__in={notification.recipient_id for notification in notifications},
+        channel_type=SubscriptionChannelType.BROWSER_PUSH,
+        enabled=True,
+    ):
+        channels[channel.recipient_id].append(channel)
+
+    outcomes = push_many(
+        PushMessage(channel.id, channel.config, notification.as_push_data())
+        for notification in notifications
+        for channel in channels[notification.recipient_id]
+    )
+
+    gone = [outcome.channel_id for outcome in outcomes if outcome.gone]
+    if gone:
+        SubscriptionChannel.objects.filter(id__in=gone).delete()
+
@@ -1,24 +1,77 @@
+from typing import Optional, Dict, Any, Set
+
 from hwk.apps.jobs.models import Job
+from hwk.apps.jobs.unit_of_work import TransitionUnit
+from hwk.apps.notifications.events import EventType
+from hwk.apps.notifications.models import Notification
+from hwk.apps.notifications.stream import publish_job_on_commit
+from hwk.apps.notifications.tasks import send_on_commit
 
 
 """
-notifications appear in preferences:
+notifications appear in preferences, as the subjects each event type is sent for:
 "notifications": {
+    "JOB_OPEN": ["Assignee"],
     "": ["Team", "Assignee"]
 }
+The "" entry applies to event types without their own entry. A member is sent a
+notification when they are one of its subjects:
+- Team: every member of the job's team
+- Assignee: the member the job is assigned to
+- CompletedBy: the member who completed the job
+Without preferences, every member is sent every notification.
 """
 
+DEFAULT_SUBJECTS = ["Team"]
+
+
+def wanted_subjects(
+    preferences: Optional[Dict[str, Any]], event_type: EventType
+) -> Set[str]:
+    notifications = (preferences or {}).get("notifications") or {}
+    return set(
+        notifications.get(event_type.name, notifications.get("", DEFAULT_SUBJECTS))
+    )
 
-def on_job_change(job: Job):
+
+def on_job_change(job: Job, unit: Optional[TransitionUnit] = None):
     """
     Called whenever a job status changes
+
+    The change is published to the team's open streams whatever the members'
+    preferences.
+
+    Notifications are only built for members whose preferences ask for them, and
+    are written with one insert, with one delivery task queued for all of them.
+
+    :param unit: Gathers the notifications to be written with the rest of the
+        transition. Without one they are written and sent straight away.
     """
-    for member in job.team.memberships.all():
+    publish_job_on_commit(job)
+
+    # Users, and so their preferences, are loaded with the memberships
+    members = list(job.team.memberships.select_related("user"))
+    event_type = job.notification_event()
+
+    wanted = []
+    for member in members:
         subjects = {"Team"}
-        if job.assignee and job.assignee.id == member.id:
+        if job.assignee_id == member.id:
             subjects.add("Assignee")
-        if job.completed_by and job.completed_by.id == member.id:
+        if job.completed_by_id == member.id:
             subjects.add("CompletedBy")
-        event_type, notification = job.as_notification(member)
-        notification.save()
-        notification.bg_send()
+        wanted.append(
+            bool(subjects & wanted_subjects(member.user.preferences, event_type))
+        )
+
+    # Every member is passed in so the assignee and completer can be named
+    notifications = [
+        notification
+        for notification, send in zip(job.as_notifications(members), wanted)
+        if send
+    ]
+    if unit is not None:
+        for notification in notifications:
+            unit.add_notification(notification)
+        return
+    send_on_commit(Notification.objects.bulk_create(notifications))
@@ -0,0 +1,138 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from django.conf import settings
+from py_vapid import Vapid
+from pywebpush import webpush, WebPushException
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Push services answer with these when a subscription will never work again
+GONE_STATUS_CODES = {401, 403, 404, 410}
+
+# VAPID tokens are signed to last 12 hours, and are reused for half of that so
+# they never reach a push service close to expiring
+VAPID_TOKEN_LIFETIME = 12 * 60 * 60
+VAPID_TOKEN_REUSE = VAPID_TOKEN_LIFETIME // 2
+
+
+class PushMessage(NamedTuple):
+    channel_id: int
+    subscription: Dict[str, Any]
+    data: str
+
+
+class PushOutcome(NamedTuple):
+    channel_id: int
+    delivered: bool
+    gone: bool
+    status_code: Optional[int]
+
+
+_sessions: Dict[str, requests.Session] = {}
+_sessions_lock = Lock()
+
+_vapid_keys: Dict[str, Vapid] = {}
+_vapid_headers: Dict[Tuple[str, str], Tuple[float, Dict[str, str]]] = {}
+_vapid_lock = Lock()
+
+
+def origin(endpoint: str) -> str:
+    url = urlparse(endpoint)
+    return f"{url.scheme}://{url.netloc}"
+
+
+def session_for(endpoint: str) -> requests.Session:
+    """
+    The pooled HTTP session for the endpoint's push service, so that connections
+    to each service are kept alive and reused between pushes.
+    """
+    key = origin(endpoint)
+    with _sessions_lock:
+        session = _sessions.get(key)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1, pool_maxsize=settings.WEBPUSH_CONCURRENCY
+            )
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _sessions[key] = session
+    return session
+
+
+def vapid_headers(endpoint: str) -> Dict[str, str]:
+    """
+    The VAPID headers for the endpoint's push service.
+
+    The same signed token is valid for every push to a service, so it is signed
+    once per audience and shared by all deliveries in the process until it is
+    due to be refreshed.
+    """
+    private_key = settings.WEBPUSH_VAPID_PRIVATE
+    audience = origin(endpoint)
+    now = time.time()
+
+    with _vapid_lock:
+        cached = _vapid_headers.get((private_key, audience))
+        if cached is not None and cached[0] > now:
+            return cached[1]
+        vapid = _vapid_keys.get(private_key)
+        if vapid is None:
+            vapid = _vapid_keys[private_key] = Vapid.from_string(
+                private_key=private_key
+            )
+
+    headers = vapid.sign(
+        {
+            "sub": settings.WEBPUSH_VAPID_SUBJECT,
+            "aud": audience,
+            "exp": int(now) + VAPID_TOKEN_LIFETIME,
+        }
+    )
+    with _vapid_lock:
+        _vapid_headers[(private_key, audience)] = (now + VAPID_TOKEN_REUSE, headers)
+    return headers
+
+
+def push(message: PushMessage) -> PushOutcome:
+    endpoint = message.subscription.get("endpoint", "")
+    try:
+        response = webpush(
+            message.subscription,
+            message.data,
+            headers=vapid_headers(endpoint),
+            timeout=settings.WEBPUSH_TIMEOUT_SECONDS,
+            requests_session=session_for(endpoint),
+        )
+        return PushOutcome(message.channel_id, True, False, response.status_code)
+    except WebPushException as e:
+        status_code = e.response.status_code if e.response is not None else None
+        return PushOutcome(
+            message.channel_id, False, status_code in GONE_STATUS_CODES, status_code
+        )
+    except Exception:
+        # Timeouts and connection errors may be temporary, so keep the channel
+        logger.exception("Push to channel %s failed", message.channel_id)
+        return PushOutcome(message.channel_id, False, False, None)
+
+
+def push_many(messages: Iterable[PushMessage]) -> List[PushOutcome]:
+    """
+    Sends the messages concurrently, up to ``WEBPUSH_CONCURRENCY`` at a time.
+
+    :return: The outcome of each message, in the same order.
+    """
+    messages = list(messages)
+    if len(messages) <= 1:
+        return [push(message) for message in messages]
+
+    workers = min(settings.WEBPUSH_CONCURRENCY, len(messages))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(push, messages))
@@ -0,0 +1,76 @@
+import time
+from datetime import datetime
+from typing import NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from hwk.apps.notifications.models import Notification
+
+
+class PurgeReport(NamedTuple):
+    read: int
+    unread: int
+    seconds: float
+    complete: bool
+
+
+def _purge(condition: Q, batch_size: int, deadline: float) -> Tuple[int, bool]:
+    """
+    Deletes the notifications matching ``condition`` in primary key ranges of at
+    most ``batch_size`` rows, until none are left or the deadline passes.
+
+    :return: The number of rows deleted, and whether none are left.
+    """
+    deleted = 0
+    while time.monotonic() < deadline:
+        ids = list(
+            Notification.objects.filter(condition)
+            .order_by("id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        if not ids:
+            return deleted, True
+        # Nothing cascades from notifications, so this is a single DELETE over
+        # the range rather than loading the rows first
+        count, _ = Notification.objects.filter(
+            condition, id__gte=ids[0], id__lte=ids[-1]
+        ).delete()
+        deleted += count
+    return deleted, False
+
+
+def purge_notifications(
+    now: Optional[datetime] = None,
+    batch_size: int = 1000,
+    time_budget: Optional[float] = None,
+) -> PurgeReport:
+    """
+    Deletes read notifications older than NOTIFICATION_READ_TTL and unread ones
+    older than NOTIFICATION_UNREAD_TTL.
+
+    :param time_budget: Seconds to spend, after which the rest is left for the
+        next run. Defaults to NOTIFICATION_PURGE_TIME_BUDGET_SECONDS.
+    """
+    now = now or timezone.now()
+    if time_budget is None:
+        time_budget = settings.NOTIFICATION_PURGE_TIME_BUDGET_SECONDS
+    started = time.monotonic()
+    deadline = started + time_budget
+
+    read, read_complete = _purge(
+        Q(date_read__lt=now - settings.NOTIFICATION_READ_TTL), batch_size, deadline
+    )
+    unread, unread_complete = _purge(
+        Q(date_read=None, date_created__lt=now - settings.NOTIFICATION_UNREAD_TTL),
+        batch_size,
+        deadline,
+    )
+
+    return PurgeReport(
+        read=read,
+        unread=unread,
+        seconds=time.monotonic() - started,
+        complete=read_complete and unread_complete,
+    )
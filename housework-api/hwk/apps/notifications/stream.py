@@ -0,0 +1,206 @@
+"""
+Live events for the notification stream. Each user has a channel for their new
+notifications, and each team one for changes to its jobs. A stream subscribes to
+the user's channel and those of their teams.
+
+Events are published once the transaction that made them commits, as complete
+server-sent event frames, so a stream only has to pass them on.
+
+With NOTIFICATION_STREAM_REDIS_URL set, events go through Redis pub/sub and
+reach streams served by any process. Without it they only reach streams in the
+publishing process, which is enough for development and tests.
+
+Django does not notice a client disconnecting while it streams, so a stream
+ends itself after NOTIFICATION_STREAM_MAX_SECONDS and the client reconnects.
+Events published while it is reconnecting are not replayed; clients catch up
+from the unread list.
+"""
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from threading import Lock
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set, Tuple
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+
+USER_CHANNEL = "hwk.stream.user.{user_id}"
+TEAM_CHANNEL = "hwk.stream.team.{team_id}"
+
+
+def user_channel(user_id) -> str:
+    return USER_CHANNEL.format(user_id=user_id)
+
+
+def team_channel(team_id) -> str:
+    return TEAM_CHANNEL.format(team_id=team_id)
+
+
+def sse_frame(event: str, data: str) -> str:
+    lines = "".join(f"data: {line}\n" for line in data.splitlines())
+    return f"event: {event}\n{lines}\n"
+
+
+class MemoryBackend:
+    """
+    Delivers events to the streams in this process.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._queues: Dict[
+            str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]
+        ] = defaultdict(set)
+
+    def publish(self, channel: str, message: str):
+        with self._lock:
+            subscribers = list(self._queues.get(channel, ()))
+        # Publishing happens in sync code, usually on another thread to the
+        # streams, so the message is handed to each stream's own loop
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+            except RuntimeError:
+                # The stream's loop has closed
+                pass
+
+    async def listen(
+        self, channels: Iterable[str], timeout: float
+    ) -> AsyncIterator[Optional[str]]:
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        channels = list(channels)
+        with self._lock:
+            for channel in channels:
+                self._queues[channel].add(subscriber)
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(subscriber[1].get(), timeout)
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            with self._lock:
+                for channel in channels:
+                    self._queues[channel].discard(subscriber)
+                    if not self._queues[channel]:
+                        del self._queues[channel]
+
+    def subscriber_count(self, channel: str) -> int:
+        with self._lock:
+            return len(self._queues.get(channel, ()))
+
+
+class RedisBackend:
+    """
+    Delivers events to the streams in every process through Redis pub/sub.
+    """
+
+    def __init__(self, url: str):
+        self.url = url
+        self._client = None
+        self._lock = Lock()
+
+    def publish(self, channel: str, message: str):
+        if self._client is None:
+            from redis import Redis
+
+            with self._lock:
+                if self._client is None:
+                    self._client = Redis.from_url(self.url)
+        self._client.publish(channel, message)
+
+    async def listen(
+        self, channels: Iterable[str], timeout: float
+    ) -> AsyncIterator[Optional[str]]:
+        from redis.asyncio import Redis
+
+        client = Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(*channels)
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=timeout
+                )
+                yield message["data"].decode() if message else None
+        finally:
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        url = settings.NOTIFICATION_STREAM_REDIS_URL
+        _backend = RedisBackend(url) if url else MemoryBackend()
+    return _backend
+
+
+def publish(channel: str, event: str, data: str):
+    try:
+        get_backend().publish(channel, sse_frame(event, data))
+    except Exception:
+        # Streams are a convenience on top of notifications, never a reason for
+        # a change to fail
+        logger.exception("Publishing %s to %s failed", event, channel)
+
+
+def publish_notifications(notifications: Iterable):
+    for notification in notifications:
+        publish(
+            user_channel(notification.recipient_id),
+            "notification",
+            notification.as_push_data(),
+        )
+
+
+def publish_job_on_commit(job):
+    """
+    Publishes the job's status to its team once the current transaction commits.
+    The job is read now, as it may have changed again by then.
+    """
+    channel = team_channel(job.team_id)
+    data = json.dumps(
+        {
+            "id": job.id,
+            "team_id": str(job.team_id),
+            "name": job.name,
+            "status": job.status,
+            "assignee_id": job.assignee_id,
+        }
+    )
+    transaction.on_commit(lambda: publish(channel, "job", data))
+
+
+async def events(channels: List[str]) -> AsyncIterator[str]:
+    """
+    The frames for a stream of the channels, with a comment sent whenever it has
+    been idle for NOTIFICATION_STREAM_KEEPALIVE_SECONDS so that proxies keep the
+    connection open. Ends once NOTIFICATION_STREAM_MAX_SECONDS have passed, which
+    releases its subscription even if the client has already gone.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.NOTIFICATION_STREAM_MAX_SECONDS
+    yield f"retry: {settings.NOTIFICATION_STREAM_RETRY_MILLISECONDS}\n\n"
+    listener = get_backend().listen(
+        channels,
+        min(
+            settings.NOTIFICATION_STREAM_KEEPALIVE_SECONDS,
+            settings.NOTIFICATION_STREAM_MAX_SECONDS,
+        ),
+    )
+    try:
+        async for frame in listener:
+            if loop.time() >= deadline:
+                break
+            yield frame if frame is not None else ": keep-alive\n\n"
+    finally:
+        # Breaking out of the loop leaves the listener open until it is closed
+        await listener.aclose()
@@ -0,0 +1,125 @@
+"""
+Pushes are coalesced per recipient. The first notification a recipient gets
+opens a digest window, and everything that arrives before it closes is pushed as
+one digest. Every notification is still saved on its own, so the unread list is
+unaffected.
+
+The window comes from the recipient's preferences, falling back to
+NOTIFICATION_DIGEST_SECONDS:
+{
+    "notification_digest_seconds": 120
+}
+A window of 0 pushes every notification straight away.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from hwk.apps.notifications.models import Notification, deliver, send_notifications
+from hwk.apps.notifications.stream import publish_notifications
+
+
+DIGEST_KEY = "hwk.notifications.digest.{recipient_id}"
+# Notifications older than this when their digest is sent are not pushed at all
+DIGEST_MAX_AGE = timedelta(days=1)
+# How many notifications a digest lists before summarising the rest
+DIGEST_LINES = 5
+
+
+def digest_window(preferences: Dict[str, Any]) -> int:
+    window = (preferences or {}).get("notification_digest_seconds")
+    if not isinstance(window, int) or window < 0:
+        return settings.NOTIFICATION_DIGEST_SECONDS
+    return window
+
+
+def send_on_commit(notifications: Iterable[Notification]):
+    """
+    Queues one task to coalesce the notifications once the current transaction
+    commits, so that it never looks for rows that are still uncommitted or get
+    rolled back. Open streams are sent the notifications at the same time.
+    """
+    notifications = list(notifications)
+    ids = [notification.id for notification in notifications]
+    if not ids:
+        return
+
+    def on_commit():
+        publish_notifications(notifications)
+        coalesce_notifications.delay(ids)
+
+    transaction.on_commit(on_commit)
+
+
+@shared_task
+def coalesce_notifications(ids: List[int]):
+    by_recipient = defaultdict(list)
+    preferences = {}
+    rows = Notification.objects.filter(id__in=ids, date_sent=None).values_list(
+        "id", "recipient_id", "recipient__preferences"
+    )
+    for notification_id, recipient_id, recipient_preferences in rows:
+        by_recipient[recipient_id].append(notification_id)
+        preferences[recipient_id] = recipient_preferences
+
+    immediate = []
+    for recipient_id, notification_ids in by_recipient.items():
+        window = digest_window(preferences[recipient_id])
+        if not window:
+            immediate.extend(notification_ids)
+            continue
+        # Only the first notification in a window schedules the digest
+        key = DIGEST_KEY.format(recipient_id=recipient_id)
+        if cache.add(key, True, window + 60):
+            send_digest.apply_async((recipient_id,), countdown=window)
+
+    if immediate:
+        send_notifications(immediate)
+
+
+def build_digest(notifications: List[Notification]) -> Notification:
+    """
+    A single, unsaved notification summarising several. Its push has no id, so
+    the service worker opens its url instead of marking it read.
+    """
+    lines = [f"{_.title}: {_.body}" for _ in notifications[:DIGEST_LINES]]
+    if len(notifications) > DIGEST_LINES:
+        lines.append(f"and {len(notifications) - DIGEST_LINES} more")
+    urls = {_.url for _ in notifications}
+    return Notification(
+        recipient_id=notifications[0].recipient_id,
+        url=urls.pop() if len(urls) == 1 else "/",
+        title=f"{len(notifications)} updates",
+        body="\n".join(lines),
+    )
+
+
+@shared_task
+def send_digest(recipient_id: int):
+    cache.delete(DIGEST_KEY.format(recipient_id=recipient_id))
+    now = timezone.now()
+
+    with transaction.atomic():
+        pending = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(
+                recipient_id=recipient_id,
+                date_sent=None,
+                date_created__gte=now - DIGEST_MAX_AGE,
+            )
+            .order_by("id")
+        )
+        Notification.objects.filter(id__in=[_.id for _ in pending]).update(
+            date_sent=now
+        )
+
+    if len(pending) > 1:
+        deliver([build_digest(pending)])
+    elif pending:
+        deliver(pending)
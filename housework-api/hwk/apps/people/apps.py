@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class PeopleConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "hwk.apps.people"
+
+    def ready(self):
+        # Connect the holiday index invalidation signals
+        from hwk.apps.people import holidays  # noqa: F401
@@ -0,0 +1,99 @@
+from bisect import bisect_right
+from datetime import date, timedelta
+from typing import Generator, List, Tuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from hwk.apps.people.models import Holiday
+
+CACHE_KEY = "hwk.holidays.{user_id}"
+CACHE_TIMEOUT = 60 * 60 * 24
+# Used when each process has its own cache, which invalidation cannot reach
+LOCAL_CACHE_TIMEOUT = 60 * 5
+
+
+class HolidayIndex:
+    """
+    A user's holidays from a given date onwards, as sorted, merged date intervals.
+    """
+
+    def __init__(self, window_start: date, intervals: List[Tuple[date, date]]):
+        self.window_start = window_start
+        self.starts = [start for start, _ in intervals]
+        self.ends = [end for _, end in intervals]
+
+    @classmethod
+    def from_intervals(
+        cls, window_start: date, intervals: List[Tuple[date, date]]
+    ) -> "HolidayIndex":
+        merged = []
+        for start, end in sorted(intervals):
+            if end < window_start:
+                continue
+            start = max(start, window_start)
+            # Merge overlapping and back-to-back holidays
+            if merged and start <= merged[-1][1] + timedelta(days=1):
+                merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+            else:
+                merged.append((start, end))
+        return cls(window_start, merged)
+
+    @classmethod
+    def for_user(cls, user_id: int, window_start: date) -> "HolidayIndex":
+        holidays = Holiday.objects.filter(
+            user_id=user_id, to_time__date__gte=window_start
+        ).values_list("from_time", "to_time")
+        return cls.from_intervals(
+            window_start,
+            [(from_time.date(), to_time.date()) for from_time, to_time in holidays],
+        )
+
+    def _containing(self, day: date) -> Optional[int]:
+        index = bisect_right(self.starts, day) - 1
+        if index >= 0 and self.ends[index] >= day:
+            return index
+        return None
+
+    def is_on_holiday(self, day: date) -> bool:
+        return self._containing(day) is not None
+
+    def next_free_date(self, day: date) -> date:
+        """
+        The first date on or after ``day`` that is not on holiday.
+        """
+        index = self._containing(day)
+        if index is None:
+            return day
+        # Intervals are merged, so the day after one ends is always free
+        return self.ends[index] + timedelta(days=1)
+
+    def dates_not_on_holiday(
+        self, dates: Generator[date, None, None]
+    ) -> Generator[date, None, None]:
+        for current_date in dates:
+            if not self.is_on_holiday(current_date):
+                yield current_date
+
+
+def get_holiday_index(user_id: int) -> HolidayIndex:
+    """
+    The holiday index for a user from today, cached until their holidays change.
+    Without a shared cache, changes made in another process are only seen once
+    LOCAL_CACHE_TIMEOUT has passed.
+    """
+    today = date.today()
+    key = CACHE_KEY.format(user_id=user_id)
+    index = cache.get(key)
+    if index is None or index.window_start != today:
+        index = HolidayIndex.for_user(user_id, today)
+        timeout = CACHE_TIMEOUT if settings.CACHE_IS_SHARED else LOCAL_CACHE_TIMEOUT
+        cache.set(key, index, timeout)
+    return index
+
+
+@receiver([post_save, post_delete], sender=Holiday)
+def invalidate_holiday_index(sender, instance: Holiday, **kwargs):
+    cache.delete(CACHE_KEY.format(user_id=instance.user_id))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 08:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("people", "0002_remove_hwkuser_first_name_remove_hwkuser_last_name_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="hwkuser",
+            name="auth_version",
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
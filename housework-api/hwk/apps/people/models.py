@@ -17,6 +17,8 @@ class HwkUser(AbstractUser):
     full_name = models.CharField(max_length=256, null=True, blank=True)
     approved = models.BooleanField(default=False)
     preferences = models.JSONField(default=preferences_factory)
+    # Raised to revoke every auth token issued to the user
+    auth_version = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         if self.full_name:
@@ -1,10 +1,11 @@
 from typing import Generator
 
-from datetime import date, timedelta
+from datetime import date
 from django.db import models
 import uuid
 
-from hwk.apps.people.models import HwkUser, Holiday
+from hwk.apps.people.holidays import get_holiday_index
+from hwk.apps.people.models import HwkUser
 
 
 class HolidayPolicy(models.TextChoices):
@@ -49,6 +50,7 @@ class MembershipRole(models.TextChoices):
 
 
 class Membership(models.Model):
+    RoleChoices = MembershipRole
 
     user = models.ForeignKey(HwkUser, on_delete=models.CASCADE, related_name="memberships")
     team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name="memberships")
@@ -66,24 +68,7 @@ class Membership(models.Model):
         :param dates: A generator that yields date objects.
         :return: A generator that yields date objects.
         """
-
-        user = self.user
-
-        # Retrieve all holiday periods for the user
-        holidays = Holiday.objects.filter(user=user)
-
-        # Convert holiday periods to a set of individual dates for efficient lookup
-        holiday_dates = set()
-        for holiday in holidays:
-            current_date = holiday.from_time.date()
-            while current_date <= holiday.to_time.date():
-                holiday_dates.add(current_date)
-                current_date += timedelta(days=1)
-
-        # Yield dates not in the holiday set
-        for current_date in dates:
-            if current_date not in holiday_dates:
-                yield current_date
+        return get_holiday_index(self.user_id).dates_not_on_holiday(dates)
 
 
 class Invitation(models.Model):
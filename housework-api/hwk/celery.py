@@ -21,4 +21,8 @@ app.conf.beat_schedule = {
         'task': 'hwk.apps.jobs.tasks.housekeeping',
         'schedule': crontab(minute='0'),
     },
+    'schedule_transitions': {
+        'task': 'hwk.apps.jobs.tasks.schedule_transitions',
+        'schedule': crontab(minute='*/5'),
+    },
 }
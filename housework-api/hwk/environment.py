@@ -14,6 +14,7 @@ class HwkEnviron(BaseSettings):
     hwk_smtp_email_host_password: str
 
     hwk_celery_broker_url: str
+    hwk_cache_redis_url: Optional[str]
 
     hwk_sec_django_debug: bool
     hwk_sec_csrf_trusted: List[str]
@@ -23,7 +24,14 @@ class HwkEnviron(BaseSettings):
 
     hwk_webpush_vapid_public: str
     hwk_webpush_vapid_private: str
+    hwk_webpush_concurrency: int = 16
+    hwk_webpush_timeout_seconds: float = 10
+    hwk_notification_digest_seconds: int = 60
+    hwk_notification_read_ttl_hours: int = 12
+    hwk_notification_unread_ttl_days: int = 90
     hwk_sec_is_prod: bool
+    hwk_auth_mode: Literal["session", "both", "token"] = "session"
+    hwk_auth_token_max_age_days: int = 14
 
     hwk_db_engine: str
     hwk_db_name: str
@@ -31,3 +39,7 @@ class HwkEnviron(BaseSettings):
     hwk_db_postgres_user: Optional[str]
     hwk_db_postgres_host: Optional[str]
     hwk_db_postgres_port: Optional[int]
+
+    hwk_job_rule_search_horizon_days: int = 3 * 365
+    hwk_job_trigger_max_fanout: int = 50
+    hwk_job_trigger_max_depth: int = 10
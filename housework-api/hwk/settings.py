@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 
 from hwk.environment import HwkEnviron
@@ -111,6 +112,23 @@ elif _environ.hwk_db_engine == "django.db.backends.postgresql_psycopg2":
     }
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Shared through Redis when configured, so locks and cached values are seen by
+# both the API and the Celery workers. Caches that must be invalidated in every
+# process are only used when it is shared.
+
+CACHE_IS_SHARED = bool(_environ.hwk_cache_redis_url)
+
+if CACHE_IS_SHARED:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": _environ.hwk_cache_redis_url,
+        }
+    }
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -153,6 +171,11 @@ STATIC_URL = "static/"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "people.HwkUser"
 
+# What logging in issues: "session" for an X-SessionID, "token" for a signed auth
+# token, or "both" while clients move over. Either is accepted in every mode.
+AUTH_MODE = _environ.hwk_auth_mode
+AUTH_TOKEN_MAX_AGE = timedelta(days=_environ.hwk_auth_token_max_age_days)
+
 CORS_ALLOWED_ORIGINS = _environ.hwk_sec_cors_origins
 
 CORS_ALLOW_METHODS = ["DELETE", "GET", "OPTIONS", "PATCH", "POST", "PUT"]
@@ -163,6 +186,7 @@ CORS_ALLOW_HEADERS = [
     "authorization",
     "content-type",
     "dnt",
+    "if-none-match",
     "origin",
     "user-agent",
     "x-csrftoken",
@@ -174,6 +198,8 @@ CSRF_TRUSTED_ORIGINS = _environ.hwk_sec_csrf_trusted
 
 CORS_ALLOW_CREDENTIALS = True
 
+CORS_EXPOSE_HEADERS = ["etag", "x-next-cursor"]
+
 
 # Celery Configuration Options
 CELERY_TIMEZONE = "Europe/London"
@@ -191,8 +217,37 @@ EMAIL_USE_SSL = _environ.hwk_smtp_email_use_ssl
 EMAIL_HOST_USER = _environ.hwk_smtp_email_host_user
 EMAIL_HOST_PASSWORD = _environ.hwk_smtp_email_host_password
 
+# How far ahead to look for a date that satisfies a trigger's rules
+JOB_RULE_SEARCH_HORIZON_DAYS = _environ.hwk_job_rule_search_horizon_days
+
+# Limits on the jobs one event can create through chains of triggers
+JOB_TRIGGER_MAX_FANOUT = _environ.hwk_job_trigger_max_fanout
+JOB_TRIGGER_MAX_DEPTH = _environ.hwk_job_trigger_max_depth
+
 WEBPUSH_VAPID_PRIVATE = _environ.hwk_webpush_vapid_private
 WEBPUSH_VAPID_PUBLIC = _environ.hwk_webpush_vapid_public
+WEBPUSH_VAPID_SUBJECT = "mailto:webmaster@tdn.sh"
+# How many pushes a worker sends at once, and how long to wait for each
+WEBPUSH_CONCURRENCY = _environ.hwk_webpush_concurrency
+WEBPUSH_TIMEOUT_SECONDS = _environ.hwk_webpush_timeout_seconds
+
+# How long to collect a member's notifications into one push, unless their
+# preferences say otherwise
+NOTIFICATION_DIGEST_SECONDS = _environ.hwk_notification_digest_seconds
+
+# How long notifications are kept, and how long each housekeeping run may spend
+# deleting them
+NOTIFICATION_READ_TTL = timedelta(hours=_environ.hwk_notification_read_ttl_hours)
+NOTIFICATION_UNREAD_TTL = timedelta(days=_environ.hwk_notification_unread_ttl_days)
+NOTIFICATION_PURGE_TIME_BUDGET_SECONDS = 60
+
+# Live notification streams go through Redis pub/sub when the cache does, and
+# otherwise only reach streams served by the publishing process
+NOTIFICATION_STREAM_REDIS_URL = _environ.hwk_cache_redis_url
+NOTIFICATION_STREAM_KEEPALIVE_SECONDS = 15
+NOTIFICATION_STREAM_RETRY_MILLISECONDS = 5000
+# How long a stream is served before the client has to reconnect
+NOTIFICATION_STREAM_MAX_SECONDS = 5 * 60
 
 SECURE_HSTS_SECONDS = 60 * 60 if _environ.hwk_sec_is_prod else 0
 SECURE_HSTS_INCLUDE_SUBDOMAINS = _environ.hwk_sec_is_prod
@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.test import TestCase, RequestFactory, override_settings
+
+from hwk.apps.api import session_cache
+from hwk.apps.api.auth import HeaderUserAuth
+from hwk.apps.people.models import HwkUser
+
+
+class HeaderUserAuthTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        session_cache.clear()
+        self.user = HwkUser.objects.create(
+            username="user_1", full_name="User One", approved=True
+        )
+        self.client.force_login(self.user)
+        self.session_key = self.client.session.session_key
+        self.headers = {"HTTP_X_SESSIONID": self.session_key}
+
+    def get(self, url):
+        return self.client.get(url, **self.headers)
+
+    def get_self(self):
+        return self.get("/api/v1/people/users/self/")
+
+    @override_settings(CACHE_IS_SHARED=True)
+    def test_cached_between_requests(self):
+        self.assertEqual(self.get_self().json()["username"], "user_1")
+
+        with self.assertNumQueries(1):
+            # Only the count
+            response = self.get("/api/v1/notifications/unread/count")
+        self.assertEqual(response.json(), {"count": 0})
+
+        # Another process has only the shared tier
+        session_cache.clear()
+        with self.assertNumQueries(1):
+            self.get("/api/v1/notifications/unread/count")
+
+    def test_not_shared(self):
+        self.get_self()
+
+        # Another process has to load the session and user itself
+        session_cache.clear()
+        with self.assertNumQueries(3):
+            self.get("/api/v1/notifications/unread/count")
+
+    def test_memoised_per_request(self):
+        request = RequestFactory().get("/", **self.headers)
+        HeaderUserAuth()(request)
+
+        with self.assertNumQueries(0):
+            session_cache.clear()
+            cache.clear()
+            self.assertEqual(HeaderUserAuth(require_approved=True)(request), self.user)
+
+    def test_approval_change(self):
+        # Jobs need an approved user
+        self.assertEqual(self.get("/api/v1/jobs/0").status_code, 404)
+
+        self.user.approved = False
+        self.user.save()
+        self.assertEqual(self.get("/api/v1/jobs/0").status_code, 401)
+
+    def test_password_change(self):
+        self.get_self()
+        response = self.client.patch(
+            "/api/v1/people/users/self/",
+            {"password": "a new password"},
+            content_type="application/json",
+            **self.headers,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        user = HeaderUserAuth()(RequestFactory().get("/", **self.headers))
+        self.assertTrue(user.check_password("a new password"))
+
+    def test_logout(self):
+        self.get_self()
+        response = self.client.delete("/api/v1/auth/session", **self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(self.get_self().status_code, 401)
+        self.assertIsNone(HeaderUserAuth()(RequestFactory().get("/", **self.headers)))
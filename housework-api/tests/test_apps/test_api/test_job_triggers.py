@@ -0,0 +1,38 @@
+from django.test import TestCase
+
+from hwk.apps.jobs.models import JobScheduleRule
+from tests.test_apps.test_jobs.test_assigner import setup_db
+
+
+class RuleRouterTest(TestCase):
+    def setUp(self):
+        self.data = setup_db()
+        self.data.user_1.approved = True
+        self.data.user_1.is_superuser = True
+        self.data.user_1.save()
+        self.client.force_login(self.data.user_1)
+        self.headers = {"HTTP_X_SESSIONID": self.client.session.session_key}
+        self.url = (
+            f"/api/v1/teams/{self.data.team.id}"
+            f"/triggers/{self.data.dishwasher_trigger.id}/rules"
+        )
+
+    def add_rule(self, days: int):
+        return self.client.post(
+            self.url,
+            {
+                "rule_type": JobScheduleRule.RuleType.DAYS_SINCE,
+                "params": {"days": days, "event": "closed"},
+            },
+            content_type="application/json",
+            **self.headers,
+        )
+
+    def test_add_rule(self):
+        response = self.add_rule(30)
+        self.assertEqual(response.status_code, 200)
+
+    def test_rejects_days_since_past_calendar(self):
+        response = self.add_rule(10**9)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.data.dishwasher_trigger.rules.count(), 1)
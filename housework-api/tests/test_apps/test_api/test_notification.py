@@ -0,0 +1,78 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from hwk.apps.notifications.models import Notification
+from hwk.apps.people.models import HwkUser
+
+
+class UnreadNotificationsTest(TestCase):
+    def setUp(self):
+        self.user = HwkUser.objects.create(
+            username="user_1", full_name="User One", approved=True
+        )
+        self.client.force_login(self.user)
+        self.headers = {"HTTP_X_SESSIONID": self.client.session.session_key}
+
+        now = timezone.now()
+        # Pairs share a creation time, so pages have to be split on id too
+        Notification.objects.bulk_create(
+            Notification(
+                recipient=self.user,
+                url=f"/jobs/{index}/",
+                title=f"Job {index}",
+                body="Bins",
+                date_created=now - timedelta(minutes=index // 2),
+            )
+            for index in range(7)
+        )
+
+    def get(self, url, **headers):
+        return self.client.get(url, **self.headers, **headers)
+
+    def test_pages(self):
+        expected = list(
+            Notification.objects.order_by("-date_created", "-id").values_list(
+                "id", flat=True
+            )
+        )
+
+        seen = []
+        url = "/api/v1/notifications/unread?limit=3"
+        while True:
+            response = self.get(url)
+            self.assertEqual(response.status_code, 200)
+            seen.extend(_["id"] for _ in response.json())
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                break
+            url = f"/api/v1/notifications/unread?limit=3&cursor={cursor}"
+
+        self.assertEqual(seen, expected)
+
+    def test_count_not_modified(self):
+        response = self.get("/api/v1/notifications/unread/count")
+        self.assertEqual(response.json(), {"count": 7})
+        etag = response.headers["ETag"]
+
+        with self.assertNumQueries(1):
+            # Only the count, as the session and user are cached
+            response = self.get(
+                "/api/v1/notifications/unread/count", HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 304)
+
+        Notification.objects.filter(title="Job 0").update(date_read=timezone.now())
+        response = self.get(
+            "/api/v1/notifications/unread/count", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.json(), {"count": 6})
+
+        response = self.get("/api/v1/notifications/unread", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.json()), 6)
+        response = self.get(
+            "/api/v1/notifications/unread",
+            HTTP_IF_NONE_MATCH=response.headers["ETag"],
+        )
+        self.assertEqual(response.status_code, 304)
@@ -0,0 +1,197 @@
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from freezegun import freeze_time
+
+from hwk.apps.api import session_cache
+from hwk.apps.api.tokens import issue_token, user_for_token
+from hwk.apps.people.models import HwkUser
+
+
+class AuthTokenTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        session_cache.clear()
+        self.user = HwkUser.objects.create(
+            username="user_1@example.com",
+            email="user_1@example.com",
+            full_name="User One",
+            approved=True,
+        )
+
+    def get(self, url, token):
+        return self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def otp_session(self) -> str:
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session["otp.challenge.sub"] = self.user.email
+        session["otp.challenge.open"] = True
+        session["otp.challenge.code"] = "abcdef"
+        session["otp.challenge.expires"] = (
+            timezone.now() + timedelta(minutes=5)
+        ).isoformat()
+        session.save()
+        return session.session_key
+
+    @override_settings(AUTH_MODE="token")
+    def test_otp_login(self):
+        response = self.client.post(
+            "/api/v1/auth/otp/respond",
+            {"code": "abcdef"},
+            content_type="application/json",
+            HTTP_X_SESSIONID=self.otp_session(),
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("x-sessionid", response.json())
+        # The challenge's session is gone, and no other was made
+        self.assertEqual(Session.objects.count(), 0)
+
+        token = response.json()["x-authtoken"]
+        response = self.get("/api/v1/people/users/self/", token)
+        self.assertEqual(response.json()["username"], self.user.username)
+
+        with self.assertNumQueries(1):
+            # Only the count, as the token is checked against the cached user
+            response = self.get("/api/v1/notifications/unread/count", token)
+        self.assertEqual(response.json(), {"count": 0})
+
+    @override_settings(AUTH_MODE="both")
+    def test_otp_login_both(self):
+        response = self.client.post(
+            "/api/v1/auth/otp/respond",
+            {"code": "abcdef"},
+            content_type="application/json",
+            HTTP_X_SESSIONID=self.otp_session(),
+        )
+        credentials = response.json()
+
+        response = self.get("/api/v1/people/users/self/", credentials["x-authtoken"])
+        self.assertEqual(response.json()["username"], self.user.username)
+        response = self.client.get(
+            "/api/v1/people/users/self/", HTTP_X_SESSIONID=credentials["x-sessionid"]
+        )
+        self.assertEqual(response.json()["username"], self.user.username)
+
+    def test_invalid_tokens(self):
+        token = issue_token(self.user)
+        self.assertEqual(user_for_token(token), self.user)
+        self.assertIsNone(user_for_token(token[:-1]))
+        self.assertIsNone(user_for_token("not a token"))
+        self.assertEqual(
+            self.get("/api/v1/notifications/unread/count", "nope").status_code, 401
+        )
+
+        with freeze_time(timezone.now() - settings.AUTH_TOKEN_MAX_AGE):
+            expired = issue_token(self.user)
+        self.assertIsNone(user_for_token(expired))
+
+    def test_logout_revokes(self):
+        token = issue_token(self.user)
+        other = issue_token(self.user)
+        self.assertEqual(
+            self.get("/api/v1/notifications/unread/count", other).status_code, 200
+        )
+
+        response = self.client.delete(
+            "/api/v1/auth/session", HTTP_AUTHORIZATION=f"Bearer {token}"
+        )
+        self.assertEqual(response.status_code, 200)
+
+        for revoked in [token, other]:
+            self.assertEqual(
+                self.get("/api/v1/notifications/unread/count", revoked).status_code,
+                401,
+            )
+        self.user.refresh_from_db()
+        self.assertEqual(user_for_token(issue_token(self.user)), self.user)
+
+    def test_password_change_revokes(self):
+        self.user.set_password("old password")
+        self.user.save()
+        token = issue_token(self.user)
+        other = issue_token(self.user)
+
+        response = self.client.post(
+            "/api/v1/people/users/self/password",
+            {"current_password": "old password", "new_password": "new password"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(response.status_code, 200)
+        # The client that changed the password is given a new token
+        new_token = response.json()["x-authtoken"]
+        for revoked in [token, other]:
+            self.assertEqual(
+                self.get("/api/v1/notifications/unread/count", revoked).status_code,
+                401,
+            )
+        self.assertEqual(
+            self.get("/api/v1/notifications/unread/count", new_token).status_code,
+            200,
+        )
+
+        response = self.client.patch(
+            "/api/v1/people/users/self/",
+            {"password": "newer password"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {new_token}",
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["full_name"], "User One")
+        newer_token = response.json()["x-authtoken"]
+        self.assertEqual(
+            self.get("/api/v1/notifications/unread/count", new_token).status_code, 401
+        )
+        self.assertEqual(
+            self.get("/api/v1/notifications/unread/count", newer_token).status_code,
+            200,
+        )
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password("newer password"))
+
+    def test_profile_update_keeps_token(self):
+        token = issue_token(self.user)
+        response = self.client.patch(
+            "/api/v1/people/users/self/",
+            {"short_name": "One"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+        self.assertEqual(response.json()["short_name"], "One")
+        self.assertIsNone(response.json()["x-authtoken"])
+        self.assertEqual(
+            self.get("/api/v1/notifications/unread/count", token).status_code, 200
+        )
+
+    def test_stale_user_save(self):
+        token = issue_token(self.user)
+        self.client.force_login(self.user)
+        headers = {"HTTP_X_SESSIONID": self.client.session.session_key}
+        # Caches the user
+        self.client.get("/api/v1/people/users/self/", **headers)
+
+        # Another process revokes the tokens and unapproves the user, which this
+        # process's cached copy does not see
+        HwkUser.objects.filter(id=self.user.id).update(
+            auth_version=F("auth_version") + 1, approved=False
+        )
+        response = self.client.patch(
+            "/api/v1/people/users/self/",
+            {"short_name": "One"},
+            content_type="application/json",
+            **headers,
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.short_name, "One")
+        self.assertFalse(self.user.approved)
+        self.assertEqual(
+            self.get("/api/v1/notifications/unread/count", token).status_code, 401
+        )
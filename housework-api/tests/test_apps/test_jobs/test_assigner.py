@@ -5,7 +5,9 @@ from django.test import TestCase
 from django.utils import timezone
 from freezegun import freeze_time
 
-from hwk.apps.jobs.assigner import create_job_from_trigger
+from hwk.apps.jobs.assigner import create_job_from_trigger, load_balances
+from hwk.apps.jobs.explanation import render_explanation
+from hwk.apps.jobs.ledger import record_credit
 from hwk.apps.jobs.models import (
     JobConfig,
     JobTrigger,
@@ -15,14 +17,14 @@ from hwk.apps.jobs.models import (
     JobScheduleRule,
 )
 from hwk.apps.people.models import HwkUser, Holiday
-from hwk.apps.teams.models import Team, Membership
+from hwk.apps.teams.models import Team, Membership, MembershipRole
 
 
 def setup_db():
     class TestData:
-        user_1 = HwkUser(username="user_1", first_name="User", last_name="One")
+        user_1 = HwkUser(username="user_1", full_name="User One")
         user_1.save()
-        user_2 = HwkUser(username="user_2", first_name="User", last_name="Two")
+        user_2 = HwkUser(username="user_2", full_name="User Two")
         user_2.save()
 
         team = Team(
@@ -34,11 +36,11 @@ def setup_db():
         team.save()
 
         user_1_membership = Membership(
-            team=team, role=Membership.RoleChoices.Admin, user=user_1
+            team=team, role=MembershipRole.Admin, user=user_1
         )
         user_1_membership.save()
         user_2_membership = Membership(
-            team=team, role=Membership.RoleChoices.Admin, user=user_2
+            team=team, role=MembershipRole.Admin, user=user_2
         )
         user_2_membership.save()
 
@@ -98,9 +100,9 @@ def setup_db():
         )
         laundry_previous.save()
 
-        Credit(person=user_1_membership, amount=10, job=dishwasher_previous).save()
+        record_credit(dishwasher_previous, 10, user_1_membership)
 
-        Credit(person=user_2_membership, amount=20, job=laundry_previous).save()
+        record_credit(laundry_previous, 20, user_2_membership)
 
     return TestData
 
@@ -174,7 +176,7 @@ class AssignerTest(TestCase):
         data = setup_db()
 
         job = create_job_from_trigger(data.dishwasher_previous, data.dishwasher_trigger)
-        self.assertEqual(job.description, expected_scheduler)
+        self.assertEqual(render_explanation(job.explanation_data), expected_scheduler)
 
     @freeze_time("2023-01-01")
     @patch("hwk.apps.jobs.assigner.random", side_effect=[0.2, 0.3])
@@ -185,7 +187,9 @@ class AssignerTest(TestCase):
 
         job = create_job_from_trigger(data.dishwasher_previous, data.dishwasher_trigger)
 
-        self.assertEqual(job.description, expected_scheduler_urgent)
+        self.assertEqual(
+            render_explanation(job.explanation_data), expected_scheduler_urgent
+        )
 
     @freeze_time("2023-01-01")
     @patch("hwk.apps.jobs.assigner.random", side_effect=[0.2, 0.3])
@@ -198,8 +202,40 @@ class AssignerTest(TestCase):
         job = create_job_from_trigger(data.dishwasher_previous, data.dishwasher_trigger)
 
         self.assertEqual(
-            job.description,
+            render_explanation(job.explanation_data),
             expected_scheduler.replace(
                 "Available from: 2023-01-12", "Available from: 2023-01-05"
             ),
         )
+
+    @freeze_time("2023-01-01")
+    def test_create_job_from_trigger_no_date(self):
+        data = setup_db()
+        JobScheduleRule(
+            trigger=data.dishwasher_trigger,
+            rule_type=JobScheduleRule.RuleType.DAY_IN_YEAR,
+            params={"gte": "02-30", "lte": "02-30"},
+        ).save()
+
+        job = create_job_from_trigger(data.dishwasher_previous, data.dishwasher_trigger)
+
+        self.assertIsNone(job)
+
+
+class LoadBalancesTest(TestCase):
+    def test_load_balances(self):
+        data = setup_db()
+
+        with self.assertNumQueries(1):
+            balances = {
+                member.id: (member.team_balance, member.job_balance)
+                for member in load_balances(data.team, data.dishwasher_config)
+            }
+
+        self.assertEqual(
+            balances,
+            {
+                data.user_1_membership.id: (10, 10),
+                data.user_2_membership.id: (20, 0),
+            },
+        )
@@ -0,0 +1,111 @@
+import time
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from hwk.apps.jobs import config_cache
+from hwk.apps.jobs.config_cache import triggers_for, get_team, attach_config
+from hwk.apps.jobs.models import JobLifecycle, Job, JobTrigger
+from tests.test_apps.test_jobs.test_assigner import setup_db
+
+
+@override_settings(CACHE_IS_SHARED=True)
+class ConfigCacheTest(TestCase):
+    def test_trigger_index(self):
+        data = setup_db()
+        config_id = data.dishwasher_config.id
+
+        triggers = triggers_for(config_id, JobLifecycle.COMPLETE)
+        self.assertEqual([_.id for _ in triggers], [data.dishwasher_trigger.id])
+        self.assertEqual(triggers_for(config_id, JobLifecycle.OPEN), [])
+
+        hits = config_cache.hits["triggers"]
+        with self.assertNumQueries(0):
+            triggers = triggers_for(config_id, JobLifecycle.COMPLETE)
+            # Configs, team and rules are loaded with the trigger
+            self.assertEqual(triggers[0].from_config.team.name, data.team.name)
+            self.assertEqual(len(triggers[0].rules.all()), 1)
+        self.assertEqual(config_cache.hits["triggers"], hits + 1)
+
+        JobTrigger.objects.create(
+            from_config=data.laundry_config,
+            create_config=data.dishwasher_config,
+            lifecycle_open=True,
+        )
+        JobTrigger.objects.create(
+            from_config=data.dishwasher_config,
+            create_config=data.laundry_config,
+            lifecycle_open=True,
+        )
+        self.assertEqual(len(triggers_for(config_id, JobLifecycle.OPEN)), 1)
+
+    def test_shared_between_processes(self):
+        data = setup_db()
+        get_team(data.team.id)
+
+        # Another process starts with an empty in-process tier
+        config_cache._local.clear()
+        misses = config_cache.misses["team"]
+        with self.assertNumQueries(0):
+            self.assertEqual(get_team(data.team.id).name, data.team.name)
+        self.assertEqual(config_cache.misses["team"], misses)
+
+        data.team.name = "Renamed"
+        data.team.save()
+        self.assertEqual(get_team(data.team.id).name, "Renamed")
+
+    def test_attach_config(self):
+        data = setup_db()
+        job = Job.objects.get(id=data.dishwasher_previous.id)
+        get_team(job.team_id)
+        config_cache.get_job_config(job.job_config_id)
+
+        with self.assertNumQueries(0):
+            attach_config(job)
+            self.assertEqual(job.team.name, data.team.name)
+            self.assertEqual(job.job_config.name, data.dishwasher_config.name)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_not_shared(self):
+        data = setup_db()
+        get_team(data.team.id)
+
+        # Invalidation would not reach other processes, so nothing is cached
+        with self.assertNumQueries(1):
+            self.assertEqual(get_team(data.team.id).name, data.team.name)
+
+    def test_local_timeout(self):
+        data = setup_db()
+        get_team(data.team.id)
+        cache.delete(
+            config_cache.CACHE_KEY.format(
+                generation=config_cache._generation(), key=f"team.{data.team.id}"
+            )
+        )
+
+        with self.assertNumQueries(0):
+            get_team(data.team.id)
+        later = time.monotonic() + config_cache.LOCAL_TIMEOUT + 1
+        with mock.patch("time.monotonic", return_value=later):
+            with self.assertNumQueries(1):
+                get_team(data.team.id)
+
+    def test_local_hits_skip_django_cache(self):
+        data = setup_db()
+        get_team(data.team.id)
+
+        with mock.patch.object(config_cache, "cache") as shared:
+            get_team(data.team.id)
+        shared.get.assert_not_called()
+
+        # Another process starts a new generation, which is seen once the local
+        # copy of the stamp expires
+        cache.set(config_cache.GENERATION_KEY, "other")
+        misses = config_cache.misses["team"]
+        get_team(data.team.id)
+        self.assertEqual(config_cache.misses["team"], misses)
+        later = time.monotonic() + config_cache.LOCAL_TIMEOUT + 1
+        with mock.patch("time.monotonic", return_value=later):
+            get_team(data.team.id)
+        self.assertEqual(config_cache.misses["team"], misses + 1)
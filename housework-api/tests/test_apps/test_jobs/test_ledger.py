@@ -0,0 +1,101 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import TestCase
+
+from hwk.apps.jobs.ledger import (
+    find_drift,
+    rebuild_balances,
+    record_credit,
+    record_credits,
+)
+from hwk.apps.jobs.models import Credit, CreditBalance, Job, TeamCreditBalance
+from tests.test_apps.test_jobs.test_assigner import setup_db
+
+
+class LedgerTest(TestCase):
+    def test_record_credit(self):
+        data = setup_db()
+        record_credit(data.laundry_previous, 5, data.user_1_membership)
+
+        self.assertEqual(
+            TeamCreditBalance.objects.get(person=data.user_1_membership).amount, 15
+        )
+        self.assertEqual(
+            CreditBalance.objects.get(
+                person=data.user_1_membership, job_config=data.laundry_config
+            ).amount,
+            5,
+        )
+        self.assertEqual(find_drift(), [])
+
+    def test_record_credits(self):
+        data = setup_db()
+        record_credits(
+            [
+                (data.laundry_previous, 5, data.user_1_membership),
+                (data.laundry_previous, 3, data.user_1_membership),
+                (data.dishwasher_previous, 4, data.user_2_membership),
+            ]
+        )
+
+        self.assertEqual(
+            CreditBalance.objects.get(
+                person=data.user_1_membership, job_config=data.laundry_config
+            ).amount,
+            8,
+        )
+        self.assertEqual(
+            TeamCreditBalance.objects.get(person=data.user_2_membership).amount, 24
+        )
+        self.assertEqual(find_drift(), [])
+
+    def test_deleted_credits(self):
+        data = setup_db()
+        record_credit(data.laundry_previous, 5, data.user_1_membership)
+        record_credit(data.dishwasher_previous, 4, data.user_1_membership)
+
+        data.laundry_config.delete()
+        self.assertEqual(find_drift(), [])
+        self.assertFalse(
+            CreditBalance.objects.filter(job_config_id=data.laundry_config.id).exists()
+        )
+
+        Job.objects.filter(id=data.dishwasher_previous.id).delete()
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(
+            TeamCreditBalance.objects.get(person=data.user_1_membership).amount,
+            sum(
+                Credit.objects.filter(person=data.user_1_membership).values_list(
+                    "amount", flat=True
+                )
+            ),
+        )
+
+    def test_rebuild_balances(self):
+        data = setup_db()
+        Credit(
+            person=data.user_2_membership, amount=7, job=data.laundry_previous
+        ).save()
+        TeamCreditBalance.objects.filter(person=data.user_1_membership).delete()
+
+        self.assertEqual(len(find_drift()), 3)
+
+        rebuild_balances()
+
+        self.assertEqual(find_drift(), [])
+        self.assertEqual(
+            TeamCreditBalance.objects.get(person=data.user_2_membership).amount, 27
+        )
+
+    def test_command_check(self):
+        data = setup_db()
+        Credit(
+            person=data.user_2_membership, amount=7, job=data.laundry_previous
+        ).save()
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_credit_balances", "--check", stdout=StringIO())
+
+        call_command("rebuild_credit_balances", stdout=StringIO())
+        call_command("rebuild_credit_balances", "--check", stdout=StringIO())
@@ -0,0 +1,365 @@
+from datetime import timedelta
+from random import Random
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from freezegun import freeze_time
+
+from hwk.apps.jobs.config_cache import attach_config
+from hwk.apps.jobs.lifecycle import (
+    Cascade,
+    locked_jobs,
+    set_job_status,
+    jobs_to_transition,
+    get_lifecycle_for_job,
+    permitted_transitions,
+)
+from hwk.apps.jobs.models import (
+    JobConfig,
+    Job,
+    JobLifecycle,
+    JobTrigger,
+    JobTriggerExistingPolicy,
+    TeamCreditBalance,
+    ACTIVE_STATUSES,
+)
+from hwk.apps.jobs.tasks import (
+    schedule_transitions,
+    transition_job,
+    housekeeping,
+    housekeeping_team,
+    team_lock,
+)
+from hwk.apps.notifications.models import Notification
+from hwk.apps.teams.models import Team, Membership, MembershipRole
+from tests.test_apps.test_jobs.test_assigner import setup_db
+
+
+class JobsToTransitionTest(TestCase):
+    @freeze_time("2023-01-01 12:00")
+    def test_matches_permitted_lifecycle_changes(self):
+        data = setup_db()
+        rng = Random(0)
+        configs = [
+            JobConfig.objects.create(
+                name=f"Config {index}",
+                default_credit=10,
+                team=data.team,
+                open_days=rng.choice([None, 0, 1, 3, 7]),
+                failed_days=rng.choice([None, 0, 2, 14]),
+            )
+            for index in range(6)
+        ]
+
+        for index in range(300):
+            due_date = rng.choice(
+                [None, timezone.now() + timedelta(hours=rng.randint(-24 * 30, 24 * 30))]
+            )
+            Job.objects.create(
+                name=f"Job {index}",
+                team=data.team,
+                job_config=rng.choice([None, *configs]),
+                default_credit=10,
+                due_date=due_date,
+                status=rng.choice(JobLifecycle.values),
+                assignee=data.user_1_membership,
+            )
+
+        expected = {
+            job.id
+            for job in Job.objects.all()
+            if (job.status, get_lifecycle_for_job(job)) in permitted_transitions
+        }
+
+        self.assertTrue(expected)
+        self.assertEqual(
+            set(jobs_to_transition().values_list("id", flat=True)), expected
+        )
+
+
+class NextTransitionTest(TestCase):
+    @freeze_time("2023-01-01 12:00")
+    def test_kept_up_to_date(self):
+        data = setup_db()
+        config = JobConfig.objects.create(
+            name="Bins", default_credit=10, team=data.team, open_days=2, failed_days=3
+        )
+        due_date = timezone.now() + timedelta(days=5)
+        job = Job.objects.create(
+            name="Bins",
+            team=data.team,
+            job_config=config,
+            default_credit=10,
+            due_date=due_date,
+            assignee=data.user_1_membership,
+        )
+        self.assertEqual(job.next_transition_at, due_date - timedelta(days=2))
+
+        job.status = JobLifecycle.OPEN
+        job.save(update_fields=["status"])
+        job.refresh_from_db()
+        self.assertEqual(job.next_transition_at, due_date)
+
+        job.status = JobLifecycle.OVERDUE
+        job.save()
+        config.failed_days = 10
+        config.save()
+        job.refresh_from_db()
+        self.assertEqual(job.next_transition_at, due_date + timedelta(days=10))
+
+        job.status = JobLifecycle.COMPLETE
+        job.save()
+        self.assertIsNone(job.next_transition_at)
+
+    @freeze_time("2023-01-01 12:00")
+    @patch("hwk.apps.jobs.tasks.transition_job.apply_async")
+    def test_schedule_transitions(self, apply_async):
+        data = setup_db()
+        cache.clear()
+        config = JobConfig.objects.create(
+            name="Bins", default_credit=10, team=data.team, open_days=1
+        )
+        soon = Job.objects.create(
+            name="Bins",
+            team=data.team,
+            job_config=config,
+            default_credit=10,
+            due_date=timezone.now() + timedelta(days=1, minutes=3),
+            assignee=data.user_1_membership,
+        )
+        Job.objects.create(
+            name="Bins",
+            team=data.team,
+            job_config=config,
+            default_credit=10,
+            due_date=timezone.now() + timedelta(days=2),
+            assignee=data.user_1_membership,
+        )
+
+        schedule_transitions()
+
+        apply_async.assert_called_once_with(
+            (soon.id,), eta=soon.next_transition_at + timedelta(seconds=1)
+        )
+
+        # Already queued, so not queued again while it waits for a worker
+        schedule_transitions()
+        apply_async.assert_called_once()
+
+    @patch("hwk.apps.notifications.models.Notification.bg_send")
+    def test_transition_job_applied_once(self, _):
+        data = setup_db()
+        config = JobConfig.objects.create(
+            name="Bins", default_credit=10, team=data.team
+        )
+        JobTrigger.objects.create(
+            from_config=config,
+            create_config=config,
+            existing_job=JobTriggerExistingPolicy.DUPLICATE,
+            lifecycle_overdue=True,
+        )
+        job = Job.objects.create(
+            name="Bins",
+            team=data.team,
+            job_config=config,
+            default_credit=10,
+            due_date=timezone.now() - timedelta(hours=1),
+            assignee=data.user_1_membership,
+        )
+
+        # A duplicate task, then housekeeping, after the first has run
+        transition_job(job.id)
+        transition_job(job.id)
+        housekeeping_team(str(data.team.id))
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobLifecycle.OVERDUE)
+        self.assertEqual(Job.objects.filter(job_config=config).count(), 2)
+
+
+class HousekeepingTest(TestCase):
+    def create_overdue_job(self, team, assignee):
+        config = JobConfig.objects.create(name="Bins", default_credit=10, team=team)
+        return Job.objects.create(
+            name="Bins",
+            team=team,
+            job_config=config,
+            default_credit=10,
+            due_date=timezone.now() - timedelta(hours=1),
+            assignee=assignee,
+        )
+
+    @patch("hwk.apps.notifications.models.Notification.bg_send")
+    def test_housekeeping_team(self, _):
+        data = setup_db()
+        other_team = Team.objects.create(
+            name="Other Team",
+            policy_team_credit_weight=10,
+            policy_job_credit_weight=10,
+            policy_random_weight=10,
+        )
+        other_membership = Membership.objects.create(
+            team=other_team, role=MembershipRole.Admin, user=data.user_1
+        )
+        job = self.create_overdue_job(data.team, data.user_1_membership)
+        other_job = self.create_overdue_job(other_team, other_membership)
+
+        with patch("hwk.apps.jobs.tasks.group") as group:
+            housekeeping()
+        self.assertEqual(
+            {signature.args[0] for signature in group.call_args.args[0]},
+            {str(data.team.id), str(other_team.id)},
+        )
+
+        result = housekeeping_team(str(data.team.id))
+
+        self.assertEqual(result["transitions"], 1)
+        job.refresh_from_db()
+        other_job.refresh_from_db()
+        self.assertEqual(job.status, JobLifecycle.OVERDUE)
+        self.assertEqual(other_job.status, JobLifecycle.SCHEDULED)
+
+    def test_housekeeping_team_locked(self):
+        data = setup_db()
+        job = self.create_overdue_job(data.team, data.user_1_membership)
+
+        with team_lock(str(data.team.id)):
+            result = housekeeping_team(str(data.team.id))
+
+        self.assertTrue(result["skipped"])
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobLifecycle.SCHEDULED)
+
+    @override_settings(CACHE_IS_SHARED=False)
+    def test_sweep_loads_configs_with_jobs(self):
+        data = setup_db()
+        jobs = [
+            self.create_overdue_job(data.team, data.user_1_membership) for _ in range(3)
+        ]
+
+        with transaction.atomic():
+            locked = list(locked_jobs().filter(id__in=[_.id for _ in jobs]))
+            # Without a shared config cache, the configs and teams come from the join
+            with self.assertNumQueries(0):
+                for job in locked:
+                    attach_config(job)
+                    self.assertEqual(job.job_config.name, "Bins")
+                    self.assertEqual(job.team.name, data.team.name)
+
+
+@patch("hwk.apps.notifications.models.Notification.bg_send")
+class CascadeTest(TestCase):
+    def create_config(self, team, name):
+        # Jobs open as soon as they are created
+        return JobConfig.objects.create(
+            name=name, default_credit=10, team=team, open_days=30
+        )
+
+    def create_trigger(self, from_config, create_config):
+        return JobTrigger.objects.create(
+            from_config=from_config,
+            create_config=create_config,
+            existing_job=JobTriggerExistingPolicy.DUPLICATE,
+            lifecycle_open=True,
+        )
+
+    def open_job(self, data, config, **limits):
+        job = Job.objects.create(
+            name=config.name,
+            team=data.team,
+            job_config=config,
+            default_credit=10,
+            due_date=timezone.now() + timedelta(days=1),
+            assignee=data.user_1_membership,
+        )
+        cascade = Cascade(job, **limits)
+        set_job_status(job, JobLifecycle.OPEN, cascade=cascade)
+        return cascade.run()
+
+    def test_self_trigger_stops_at_cycle(self, _):
+        data = setup_db()
+        config = self.create_config(data.team, "Loop")
+        trigger = self.create_trigger(config, config)
+
+        summary = self.open_job(data, config)
+
+        self.assertEqual(len(summary.created_job_ids), 1)
+        self.assertEqual(summary.cycle_trigger_ids, [trigger.id])
+        self.assertEqual(summary.transitions, 2)
+        self.assertFalse(summary.truncated)
+
+    def test_chain_depth_limit(self, _):
+        data = setup_db()
+        configs = [self.create_config(data.team, f"Step {_}") for _ in range(5)]
+        for from_config, create_config in zip(configs, configs[1:]):
+            self.create_trigger(from_config, create_config)
+
+        summary = self.open_job(data, configs[0], max_depth=2)
+
+        self.assertEqual(len(summary.created_job_ids), 2)
+        self.assertEqual(summary.max_depth, 2)
+        self.assertTrue(summary.truncated)
+
+    def test_fanout_limit(self, _):
+        data = setup_db()
+        root = self.create_config(data.team, "Root")
+        for index in range(4):
+            self.create_trigger(root, self.create_config(data.team, f"Leaf {index}"))
+
+        summary = self.open_job(data, root, max_fanout=3)
+
+        self.assertEqual(len(summary.created_job_ids), 3)
+        self.assertEqual(summary.max_depth, 1)
+        self.assertTrue(summary.truncated)
+
+    def test_zero_limit(self, _):
+        data = setup_db()
+        root = self.create_config(data.team, "Root")
+        self.create_trigger(root, self.create_config(data.team, "Leaf"))
+
+        # Zero is a limit, not a fall back to the default
+        summary = self.open_job(data, root, max_fanout=0)
+
+        self.assertEqual(summary.created_job_ids, [])
+        self.assertTrue(summary.truncated)
+
+
+class TransitionUnitTest(TestCase):
+    @patch("hwk.apps.notifications.tasks.coalesce_notifications.delay")
+    def test_completion_written_together(self, delay):
+        data = setup_db()
+        job = Job.objects.create(
+            name="Dishwasher",
+            team=data.team,
+            job_config=data.dishwasher_config,
+            default_credit=10,
+            assignee=data.user_1_membership,
+        )
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            set_job_status(job, JobLifecycle.COMPLETE, data.user_1_membership)
+            # Nothing is sent until the transition commits
+            delay.assert_not_called()
+
+            # The new credit, less the setup credit on the job the trigger replaced
+            self.assertEqual(
+                TeamCreditBalance.objects.get(person=data.user_1_membership).amount,
+                10,
+            )
+            new_job = Job.objects.get(
+                job_config=data.dishwasher_config, status__in=ACTIVE_STATUSES
+            )
+            # One notification per member, for the completion and the new job
+            notifications = Notification.objects.order_by("id")
+            self.assertEqual(notifications.count(), 4)
+            self.assertEqual(
+                [_.url for _ in notifications],
+                [f"/jobs/{job.id}/"] * 2 + [f"/jobs/{new_job.id}/"] * 2,
+            )
+
+        for callback in callbacks:
+            callback()
+        delay.assert_called_once_with([_.id for _ in notifications])
@@ -0,0 +1,177 @@
+from datetime import date, timedelta, datetime, timezone as dt_timezone
+from itertools import islice
+from random import Random
+from unittest import TestCase
+from unittest.mock import patch
+
+import numpy as np
+
+from django.test import TestCase as DatabaseTestCase
+
+from hwk.apps.jobs.availability import TeamAvailability
+from hwk.apps.jobs.models import Job, JobScheduleRule
+from hwk.apps.jobs.rules import (
+    RuleDayInWeek,
+    RuleDaysSince,
+    RuleDayInYear,
+    WeekDay,
+    ValidEvent,
+    solve_next_date,
+    first_date_on_or_after,
+    validate_rule,
+    validate_rule_set,
+    build_rules,
+    rules_date_mask,
+)
+from hwk.apps.people.holidays import HolidayIndex
+from tests.test_apps.test_jobs.test_assigner import setup_db
+
+HORIZON = 4000
+
+
+def random_rule(rng: Random):
+    kind = rng.choice(["week", "since", "year"])
+    if kind == "week":
+        return RuleDayInWeek(days=rng.sample(list(WeekDay), rng.randint(1, 3)))
+    if kind == "since":
+        return RuleDaysSince(
+            days=rng.randint(0, 120), event=rng.choice(list(ValidEvent))
+        )
+    month_days = [(rng.randint(1, 12), rng.randint(1, 31)) for _ in range(2)]
+    if rng.random() < 0.1:
+        month_days[0] = (2, 29)
+    gte, lte = (f"{month:02d}-{day:02d}" for month, day in month_days)
+    return RuleDayInYear(gte=gte, lte=lte)
+
+
+def random_case(rng: Random):
+    start = date(2023, 1, 1) + timedelta(days=rng.randint(0, 3000))
+    job = Job(
+        created_date=datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+        + timedelta(days=rng.randint(0, 3000)),
+        closed_date=rng.choice(
+            [
+                None,
+                datetime(2023, 1, 1, tzinfo=dt_timezone.utc)
+                + timedelta(days=rng.randint(0, 3000)),
+            ]
+        ),
+    )
+    rules = [random_rule(rng) for _ in range(rng.randint(0, 3))]
+    holidays = []
+    for _ in range(rng.randint(0, 5)):
+        holiday_start = start + timedelta(days=rng.randint(-30, 60))
+        holidays.append(
+            (holiday_start, holiday_start + timedelta(days=rng.randint(0, 20)))
+        )
+    return start, job, rules, HolidayIndex.from_intervals(start, holidays)
+
+
+def generator_next_date(rules, job, start, holidays):
+    dates = (start + timedelta(days=offset) for offset in range(HORIZON))
+    dates = holidays.dates_not_on_holiday(dates)
+    for rule in rules:
+        dates = rule(job, dates)
+    return next(islice(dates, 1), None)
+
+
+class SolveNextDateTest(TestCase):
+    def test_matches_generator_pipeline(self):
+        for seed in range(500):
+            start, job, rules, holidays = random_case(Random(seed))
+
+            expected = generator_next_date(rules, job, start, holidays)
+            actual = solve_next_date(
+                rules,
+                job,
+                start,
+                holidays=holidays,
+                until=start + timedelta(days=HORIZON - 1),
+            )
+
+            self.assertEqual(actual, expected, f"seed {seed}")
+
+    def test_team_availability_matches_solver(self):
+        for seed in range(300):
+            start, job, rules, holidays = random_case(Random(seed))
+            until = start + timedelta(days=HORIZON - 1)
+
+            expected = solve_next_date(
+                rules, job, start, holidays=holidays, until=until
+            )
+
+            with patch(
+                "hwk.apps.jobs.availability.get_holiday_index", return_value=holidays
+            ):
+                availability = TeamAvailability([1], start, HORIZON)
+            date_mask = rules_date_mask(rules, job, availability.dates)
+
+            self.assertEqual(
+                availability.earliest_dates(date_mask), {1: expected}, f"seed {seed}"
+            )
+
+    def test_first_date_on_or_after(self):
+        self.assertEqual(first_date_on_or_after(2023, 2, 29), date(2023, 3, 1))
+        self.assertEqual(first_date_on_or_after(2024, 2, 29), date(2024, 2, 29))
+        self.assertEqual(first_date_on_or_after(2023, 12, 32), None)
+        self.assertEqual(first_date_on_or_after(2023, 4, 0), date(2023, 4, 1))
+
+    def test_unsatisfiable_day_in_year(self):
+        rule = RuleDayInYear(gte="02-30", lte="02-30")
+        self.assertIsNone(solve_next_date([rule], Job(), date(2023, 1, 1)))
+
+
+class ValidateRuleTest(TestCase):
+    def test_rejects_impossible_day_in_year(self):
+        rule = JobScheduleRule(
+            rule_type=JobScheduleRule.RuleType.DAY_IN_YEAR,
+            params={"gte": "02-30", "lte": "02-30"},
+        )
+        valid, _ = validate_rule(rule)
+        self.assertFalse(valid)
+
+    def test_accepts_leap_day(self):
+        rule = JobScheduleRule(
+            rule_type=JobScheduleRule.RuleType.DAY_IN_YEAR,
+            params={"gte": "02-29", "lte": "02-29"},
+        )
+        valid, _ = validate_rule(rule)
+        self.assertTrue(valid)
+
+    def test_rule_set(self):
+        monday = JobScheduleRule(
+            rule_type=JobScheduleRule.RuleType.DAY_IN_WEEK,
+            params={"days": ["Monday"]},
+        )
+        friday = JobScheduleRule(
+            rule_type=JobScheduleRule.RuleType.DAY_IN_WEEK,
+            params={"days": ["Friday", "Sunday"]},
+        )
+        since = JobScheduleRule(
+            rule_type=JobScheduleRule.RuleType.DAYS_SINCE,
+            params={"days": 90, "event": "closed"},
+        )
+
+        self.assertEqual(validate_rule_set([monday, since]), (True, None))
+        self.assertFalse(validate_rule_set([monday, friday, since])[0])
+
+
+class BuildRulesTest(DatabaseTestCase):
+    def test_compiled_once_per_version(self):
+        data = setup_db()
+        trigger = data.dishwasher_trigger
+
+        rules = build_rules(trigger)
+        with self.assertNumQueries(0):
+            self.assertIs(build_rules(trigger), rules)
+
+        rule = JobScheduleRule.objects.create(
+            trigger=trigger,
+            rule_type=JobScheduleRule.RuleType.DAY_IN_WEEK,
+            params={"days": ["Monday"]},
+        )
+        self.assertEqual(len(build_rules(trigger)), 2)
+
+        rule.delete()
+        trigger.refresh_from_db()
+        self.assertEqual(len(build_rules(trigger)), 1)
@@ -0,0 +1,103 @@
+from random import Random
+from unittest import TestCase
+
+import numpy as np
+
+from hwk.apps.jobs.scoring import score_candidates, ScoringPolicy
+
+
+def legacy_select(workers, policy: ScoringPolicy, restrict_to_earliest: bool):
+    """The dict based selection the assigner used before the scoring engine"""
+
+    def normalise(data, key, max_value):
+        min_value = min(_[key] for _ in data)
+        for item in data:
+            item["normed_" + key] = min(1, (item[key] - min_value) / max_value)
+
+    normalise(workers, "team_balance", policy.max_team_diff)
+    normalise(workers, "job_balance", policy.max_job_diff)
+
+    earliest_date = min(_["available_date"] for _ in workers)
+
+    if restrict_to_earliest:
+        workers = [_ for _ in workers if _["available_date"] == earliest_date]
+
+    for worker in workers:
+        weighted = worker["random_value"] * policy.random_weight
+        weighted += worker["normed_team_balance"] * policy.team_credit_weight
+        weighted += worker["normed_job_balance"] * policy.job_credit_weight
+        worker["score"] = weighted
+
+    return sorted(workers, key=lambda _: _["score"])[0]["index"]
+
+
+def random_case(rng: Random):
+    policy = ScoringPolicy(
+        max_team_diff=rng.randint(1, 600),
+        max_job_diff=rng.randint(1, 120),
+        random_weight=rng.randint(0, 20),
+        team_credit_weight=rng.randint(0, 20),
+        job_credit_weight=rng.randint(0, 20),
+    )
+    workers = [
+        dict(
+            index=index,
+            available_date=rng.randint(0, 5),
+            team_balance=rng.randint(0, 1000),
+            job_balance=rng.choice([0, 10, 20, rng.randint(0, 200)]),
+            random_value=rng.random(),
+        )
+        for index in range(rng.randint(1, 12))
+    ]
+    return policy, workers, rng.random() < 0.5
+
+
+def as_arrays(workers):
+    return dict(
+        day_offset=np.array([_["available_date"] for _ in workers]),
+        team_balance=np.array([_["team_balance"] for _ in workers]),
+        job_balance=np.array([_["job_balance"] for _ in workers]),
+        random_value=np.array([_["random_value"] for _ in workers]),
+    )
+
+
+class ScoringTest(TestCase):
+    def test_matches_legacy_selection(self):
+        for seed in range(500):
+            policy, workers, restrict = random_case(Random(seed))
+            expected = legacy_select([dict(_) for _ in workers], policy, restrict)
+
+            scores = score_candidates(
+                policy, **as_arrays(workers), restrict_to_earliest=restrict
+            )
+
+            self.assertEqual(scores.selected, expected, f"seed {seed}")
+
+    def test_scores_many_triggers(self):
+        rng = Random(0)
+        policy, _, _ = random_case(rng)
+        cases = []
+        for _ in range(20):
+            workers = [
+                dict(
+                    index=index,
+                    available_date=rng.randint(0, 5),
+                    team_balance=rng.randint(0, 1000),
+                    job_balance=rng.randint(0, 200),
+                    random_value=rng.random(),
+                )
+                for index in range(8)
+            ]
+            cases.append((workers, rng.random() < 0.5))
+
+        arrays = [as_arrays(workers) for workers, _ in cases]
+        scores = score_candidates(
+            policy,
+            **{key: np.stack([_[key] for _ in arrays]) for key in arrays[0]},
+            restrict_to_earliest=np.array([restrict for _, restrict in cases]),
+        )
+
+        self.assertEqual(
+            list(scores.selected),
+            [legacy_select(workers, policy, restrict) for workers, restrict in cases],
+        )
@@ -0,0 +1,70 @@
+import json
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from hwk.apps.notifications.models import Notification
+from hwk.apps.notifications.tasks import coalesce_notifications, send_digest
+from hwk.apps.people.models import HwkUser
+
+
+@patch("hwk.apps.notifications.tasks.deliver")
+@patch("hwk.apps.notifications.models.deliver")
+class DigestTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = HwkUser.objects.create(username="user_1", full_name="User One")
+
+    def notify(self, count, user=None):
+        return Notification.objects.bulk_create(
+            Notification(
+                recipient=user or self.user,
+                url=f"/jobs/{index}/",
+                title=f"Job {index} is open",
+                body="Bins (Test Team)",
+            )
+            for index in range(count)
+        )
+
+    @patch("hwk.apps.notifications.tasks.send_digest.apply_async")
+    def test_one_digest_per_window(self, apply_async, *_):
+        coalesce_notifications([_.id for _ in self.notify(2)])
+        coalesce_notifications([_.id for _ in self.notify(1)])
+
+        apply_async.assert_called_once_with((self.user.id,), countdown=60)
+
+    def test_digest_window_preference(self, deliver, *_):
+        self.user.preferences = {"notification_digest_seconds": 0}
+        self.user.save()
+
+        notifications = self.notify(2)
+        coalesce_notifications([_.id for _ in notifications])
+
+        self.assertEqual(
+            [_.id for _ in deliver.call_args.args[0]], [_.id for _ in notifications]
+        )
+        self.assertFalse(Notification.objects.filter(date_sent=None).exists())
+
+    def test_send_digest(self, _, deliver):
+        self.notify(7)
+
+        send_digest(self.user.id)
+
+        (digest,) = deliver.call_args.args[0]
+        self.assertEqual(digest.title, "7 updates")
+        self.assertEqual(digest.url, "/")
+        self.assertEqual(len(digest.body.splitlines()), 6)
+        # The digest is not saved, so clients open its url rather than marking it read
+        self.assertEqual(json.loads(digest.as_push_data())["id"], None)
+        # Everything is still unread
+        self.assertEqual(
+            Notification.objects.filter(
+                date_read=None, date_sent__isnull=False
+            ).count(),
+            7,
+        )
+
+        deliver.reset_mock()
+        send_digest(self.user.id)
+        deliver.assert_not_called()
@@ -0,0 +1,79 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+
+from hwk.apps.jobs.config_cache import attach_config
+from hwk.apps.jobs.models import Job, JobLifecycle
+from hwk.apps.notifications.models import Notification
+from hwk.apps.notifications.notify import on_job_change
+from hwk.apps.people.models import HwkUser
+from hwk.apps.teams.models import Membership, MembershipRole
+from tests.test_apps.test_jobs.test_assigner import setup_db
+
+
+class OnJobChangeTest(TestCase):
+    @patch("hwk.apps.notifications.tasks.coalesce_notifications.delay")
+    def test_bulk_fan_out(self, delay):
+        data = setup_db()
+        for index in range(8):
+            user = HwkUser.objects.create(
+                username=f"member_{index}", full_name=f"Member {index}"
+            )
+            Membership.objects.create(
+                team=data.team, role=MembershipRole.Member, user=user
+            )
+        job = Job.objects.get(id=data.dishwasher_previous.id)
+        job.status = JobLifecycle.COMPLETE
+        job.completed_by_id = data.user_2_membership.id
+        attach_config(job)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            # Memberships and the insert
+            with self.assertNumQueries(2):
+                on_job_change(job)
+
+        notifications = Notification.objects.order_by("id")
+        self.assertEqual(notifications.count(), 10)
+        delay.assert_called_once_with([_.id for _ in notifications])
+
+        titles = {_.recipient_id: _.title for _ in notifications}
+        self.assertEqual(titles[data.user_2_membership.user_id], "Job complete by you")
+        self.assertEqual(
+            titles[data.user_1_membership.user_id],
+            f"Job complete by {data.user_2_membership.user}",
+        )
+        self.assertEqual(
+            {_.body for _ in notifications}, {f"{job.name} ({data.team.name})"}
+        )
+
+    @patch("hwk.apps.notifications.tasks.coalesce_notifications.delay")
+    def test_subject_preferences(self, _):
+        data = setup_db()
+        # Only told about jobs opening for them, and everything else as usual
+        data.user_1.preferences = {
+            "notifications": {"JOB_OPEN": ["Assignee"], "": ["Team"]}
+        }
+        data.user_1.save()
+        # Only told about their own jobs
+        data.user_2.preferences = {"notifications": {"": ["Assignee", "CompletedBy"]}}
+        data.user_2.save()
+
+        job = Job.objects.get(id=data.dishwasher_previous.id)
+        attach_config(job)
+
+        def recipients(status):
+            Notification.objects.all().delete()
+            job.status = status
+            with self.assertNumQueries(2):
+                on_job_change(job)
+            return set(Notification.objects.values_list("recipient_id", flat=True))
+
+        # The job is assigned to user 1
+        self.assertEqual(recipients(JobLifecycle.OPEN), {data.user_1.id})
+        self.assertEqual(recipients(JobLifecycle.OVERDUE), {data.user_1.id})
+
+        job.assignee = data.user_2_membership
+        self.assertEqual(recipients(JobLifecycle.OPEN), {data.user_2.id})
+        self.assertEqual(
+            recipients(JobLifecycle.OVERDUE), {data.user_1.id, data.user_2.id}
+        )
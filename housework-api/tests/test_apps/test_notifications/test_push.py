@@ -0,0 +1,72 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from freezegun import freeze_time
+from py_vapid import Vapid
+
+from hwk.apps.notifications.fake_push import FakePushServer, generate_vapid_private_key
+from hwk.apps.notifications.models import (
+    Notification,
+    SubscriptionChannel,
+    SubscriptionChannelType,
+    deliver,
+)
+from hwk.apps.notifications.push import vapid_headers, VAPID_TOKEN_REUSE
+from hwk.apps.people.models import HwkUser
+
+
+@override_settings(WEBPUSH_VAPID_PRIVATE=generate_vapid_private_key())
+class DeliverTest(TestCase):
+    def test_deliver(self):
+        user_1 = HwkUser.objects.create(username="user_1", full_name="User One")
+        user_2 = HwkUser.objects.create(username="user_2", full_name="User Two")
+
+        with FakePushServer() as server:
+
+            def channel(user, name, gone=False, enabled=True):
+                return SubscriptionChannel.objects.create(
+                    recipient=user,
+                    name=name,
+                    channel_type=SubscriptionChannelType.BROWSER_PUSH,
+                    config=server.subscription(gone=gone),
+                    enabled=enabled,
+                )
+
+            phone = channel(user_1, "Phone")
+            laptop = channel(user_1, "Laptop", enabled=False)
+            expired = channel(user_2, "Old phone", gone=True)
+            tablet = channel(user_2, "Tablet")
+
+            notifications = Notification.objects.bulk_create(
+                Notification(recipient=user, url="/jobs/1/", title="Job", body="Bins")
+                for user in [user_1, user_2, user_2]
+            )
+            deliver(notifications)
+
+        # The disabled channel is skipped
+        self.assertEqual(server.received, 5)
+        self.assertEqual(
+            set(SubscriptionChannel.objects.values_list("id", flat=True)),
+            {phone.id, laptop.id, tablet.id},
+        )
+        self.assertFalse(SubscriptionChannel.objects.filter(id=expired.id).exists())
+
+
+@override_settings(WEBPUSH_VAPID_PRIVATE=generate_vapid_private_key())
+class VapidHeadersTest(TestCase):
+    def test_signed_once_per_audience(self):
+        with freeze_time("2023-01-01 08:00") as frozen, patch.object(
+            Vapid, "sign", autospec=True, side_effect=Vapid.sign
+        ) as sign:
+            headers = vapid_headers("https://push.example.com/a")
+            self.assertIs(vapid_headers("https://push.example.com/b"), headers)
+            self.assertEqual(sign.call_count, 1)
+
+            self.assertIsNot(vapid_headers("https://other.example.com/a"), headers)
+            self.assertEqual(sign.call_count, 2)
+
+            # Refreshed well before the token expires
+            frozen.tick(timedelta(seconds=VAPID_TOKEN_REUSE + 1))
+            self.assertIsNot(vapid_headers("https://push.example.com/a"), headers)
+            self.assertEqual(sign.call_count, 3)
@@ -0,0 +1,55 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from hwk.apps.notifications.models import Notification
+from hwk.apps.notifications.retention import purge_notifications
+from hwk.apps.people.models import HwkUser
+
+
+class PurgeNotificationsTest(TestCase):
+    def setUp(self):
+        user = HwkUser.objects.create(username="user_1", full_name="User One")
+        now = timezone.now()
+
+        def notification(title, created_days_ago, read_hours_ago=None):
+            return Notification(
+                recipient=user,
+                url="/jobs/1/",
+                title=title,
+                body="Bins",
+                date_created=now - timedelta(days=created_days_ago),
+                date_read=None
+                if read_hours_ago is None
+                else now - timedelta(hours=read_hours_ago),
+            )
+
+        Notification.objects.bulk_create(
+            [notification("Read long ago", 2, 24) for _ in range(5)]
+            + [notification("Read recently", 1, 1)]
+            + [notification("Unread and old", 100) for _ in range(3)]
+            + [notification("Unread", 10)]
+        )
+
+    def test_purge(self):
+        report = purge_notifications(batch_size=2)
+
+        self.assertEqual((report.read, report.unread, report.complete), (5, 3, True))
+        self.assertEqual(
+            set(Notification.objects.values_list("title", flat=True)),
+            {"Read recently", "Unread"},
+        )
+
+    def test_time_budget(self):
+        report = purge_notifications(time_budget=-1)
+
+        self.assertEqual((report.read, report.unread, report.complete), (0, 0, False))
+        self.assertEqual(Notification.objects.count(), 10)
+
+    def test_zero_time_budget(self):
+        # Zero is a budget, not a fall back to the default
+        report = purge_notifications(time_budget=0)
+
+        self.assertFalse(report.complete)
+        self.assertEqual(Notification.objects.count(), 10)
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from typing import List
+
+from asgiref.sync import sync_to_async
+from django.test import TestCase, override_settings
+
+from hwk.apps.jobs.models import Job
+from hwk.apps.notifications.notify import on_job_change
+from hwk.apps.notifications.stream import (
+    MemoryBackend,
+    events,
+    get_backend,
+    team_channel,
+    user_channel,
+)
+from tests.test_apps.test_jobs.test_assigner import setup_db
+
+
+async def collect(stream) -> List[str]:
+    return [frame async for frame in stream]
+
+
+def parse(frame: str):
+    event, data = frame.strip().split("\n", 1)
+    return event.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+class MemoryBackendTest(TestCase):
+    async def test_publish_and_listen(self):
+        backend = MemoryBackend()
+        listener = backend.listen(["a", "b"], timeout=0.05)
+        waiting = asyncio.ensure_future(anext(listener))
+        await asyncio.sleep(0)
+        self.assertEqual(backend.subscriber_count("a"), 1)
+
+        backend.publish("c", "ignored")
+        backend.publish("b", "message")
+        self.assertEqual(await waiting, "message")
+        # Idle streams are woken for keep-alives
+        self.assertIsNone(await anext(listener))
+
+        await listener.aclose()
+        self.assertEqual(backend.subscriber_count("a"), 0)
+
+
+class StreamTest(TestCase):
+    async def test_job_changes_published_on_commit(self):
+        data = await sync_to_async(setup_db)()
+        job = await Job.objects.select_related("team").aget(
+            id=data.dishwasher_previous.id
+        )
+        listener = get_backend().listen([team_channel(job.team_id)], timeout=1)
+        waiting = asyncio.ensure_future(anext(listener))
+        await asyncio.sleep(0)
+
+        def change():
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                on_job_change(job)
+                # Nothing is published until the transaction commits
+                self.assertFalse(waiting.done())
+            return callbacks
+
+        await sync_to_async(change)()
+        event, payload = parse(await waiting)
+        self.assertEqual(event, "job")
+        self.assertEqual(payload["id"], job.id)
+        self.assertEqual(payload["status"], job.status)
+        await listener.aclose()
+
+    async def test_stream_endpoint(self):
+        data = await sync_to_async(setup_db)()
+        user = data.user_1
+
+        await sync_to_async(self.client.force_login)(user)
+        session_key = await sync_to_async(lambda: self.client.session.session_key)()
+        response = await self.async_client.get(
+            "/api/v1/notifications/stream", headers={"X-SessionID": session_key}
+        )
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+
+        content = response.streaming_content
+        self.assertTrue((await anext(content)).startswith(b"retry:"))
+        waiting = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+
+        get_backend().publish(user_channel(user.id), "event: ping\ndata: 1\n\n")
+        self.assertEqual(await waiting, b"event: ping\ndata: 1\n\n")
+        waiting = asyncio.ensure_future(anext(content))
+        await asyncio.sleep(0)
+        get_backend().publish(team_channel(data.team.id), "event: job\ndata: 2\n\n")
+        self.assertEqual(await waiting, b"event: job\ndata: 2\n\n")
+        await content.aclose()
+
+    async def test_stream_requires_session(self):
+        response = await self.async_client.get("/api/v1/notifications/stream")
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(NOTIFICATION_STREAM_MAX_SECONDS=0.05)
+    async def test_stream_ends(self):
+        backend = get_backend()
+        channel = user_channel(0)
+        stream = events([channel])
+        self.assertTrue((await anext(stream)).startswith("retry:"))
+
+        rest = asyncio.ensure_future(collect(stream))
+        await asyncio.sleep(0)
+        self.assertEqual(backend.subscriber_count(channel), 1)
+
+        # Ends before a keep-alive is due, releasing its subscriber
+        self.assertEqual(await rest, [])
+        self.assertEqual(backend.subscriber_count(channel), 0)
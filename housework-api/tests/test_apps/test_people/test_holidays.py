@@ -0,0 +1,83 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+from django.test import TestCase
+from freezegun import freeze_time
+
+from hwk.apps.people.holidays import HolidayIndex, get_holiday_index
+from hwk.apps.people.models import HwkUser, Holiday
+
+
+def aware(day: date) -> datetime:
+    return datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc)
+
+
+class HolidayIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_merges_intervals_in_window(self):
+        index = HolidayIndex.from_intervals(
+            date(2023, 1, 5),
+            [
+                (date(2023, 1, 10), date(2023, 1, 12)),
+                (date(2022, 12, 1), date(2022, 12, 5)),
+                (date(2023, 1, 1), date(2023, 1, 6)),
+                (date(2023, 1, 7), date(2023, 1, 8)),
+                (date(2023, 1, 11), date(2023, 1, 15)),
+            ],
+        )
+
+        self.assertEqual(index.starts, [date(2023, 1, 5), date(2023, 1, 10)])
+        self.assertEqual(index.ends, [date(2023, 1, 8), date(2023, 1, 15)])
+
+    def test_next_free_date(self):
+        index = HolidayIndex.from_intervals(
+            date(2023, 1, 1),
+            [
+                (date(2023, 1, 3), date(2023, 1, 4)),
+                (date(2023, 1, 5), date(2023, 1, 6)),
+                (date(2023, 1, 10), date(2023, 1, 10)),
+            ],
+        )
+
+        self.assertEqual(index.next_free_date(date(2023, 1, 2)), date(2023, 1, 2))
+        self.assertEqual(index.next_free_date(date(2023, 1, 3)), date(2023, 1, 7))
+        self.assertEqual(index.next_free_date(date(2023, 1, 10)), date(2023, 1, 11))
+        self.assertEqual(index.next_free_date(date(2023, 2, 1)), date(2023, 2, 1))
+
+    @freeze_time("2023-01-01")
+    def test_cached_index_invalidated(self):
+        user = HwkUser.objects.create(username="user")
+        self.assertFalse(get_holiday_index(user.id).is_on_holiday(date(2023, 1, 3)))
+
+        holiday = Holiday.objects.create(
+            user=user,
+            from_time=aware(date(2023, 1, 2)),
+            to_time=aware(date(2023, 1, 4)),
+        )
+        self.assertTrue(get_holiday_index(user.id).is_on_holiday(date(2023, 1, 3)))
+
+        holiday.delete()
+        self.assertFalse(get_holiday_index(user.id).is_on_holiday(date(2023, 1, 3)))
+
+        with self.assertNumQueries(0):
+            get_holiday_index(user.id)
+
+    def test_cache_timeout_when_not_shared(self):
+        user = HwkUser.objects.create(username="user")
+        with freeze_time("2023-01-01 12:00"):
+            get_holiday_index(user.id)
+            # As if added by another process, whose invalidation is not seen here
+            Holiday.objects.bulk_create(
+                [
+                    Holiday(
+                        user=user,
+                        from_time=aware(date(2023, 1, 2)),
+                        to_time=aware(date(2023, 1, 4)),
+                    )
+                ]
+            )
+            self.assertFalse(get_holiday_index(user.id).is_on_holiday(date(2023, 1, 3)))
+        with freeze_time("2023-01-01 12:06"):
+            self.assertTrue(get_holiday_index(user.id).is_on_holiday(date(2023, 1, 3)))
@@ -10,9 +10,11 @@ self.addEventListener("activate", (event) => {
 
 self.addEventListener("push", function (event) {
   const data = event.data.json();
+  // Digests are not saved, so have no id and go straight to their url
+  const path = data.id == null ? data.url : `/notification/${data.id}`;
   const options = {
     body: data.body,
-    data: data.id,
+    data: path,
   };
 
   event.waitUntil(self.registration.showNotification(data.title, options));
@@ -20,10 +22,10 @@ self.addEventListener("push", function (event) {
 
 self.addEventListener("notificationclick", function (event) {
   event.notification.close(); // Close the notification
-  const notificationId = event.notification.data;
+  const path = event.notification.data;
 
   // URL to navigate to
-  const urlToOpen = new URL(`/notification/${notificationId}`, appBaseUrl).href;
+  const urlToOpen = new URL(path, appBaseUrl).href;
 
   const promiseChain = self.clients
     .matchAll({
@@ -39,7 +41,7 @@ self.addEventListener("notificationclick", function (event) {
         return found.focus().then((client) => {
           return client.postMessage({
             action: "goto",
-            url: `/notification/${notificationId}`,
+            url: path,
           });
         });
       } else {